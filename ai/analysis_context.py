@@ -0,0 +1,68 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from batching import DEFAULT_BATCH_SIZE, run_batched
+from chunking import MAX_WINDOWS, WINDOW_STRIDE, Window, token_windows
+
+
+class AnalysisContext:
+    """Per-document state shared by the bias and sentiment stages.
+
+    The document is tokenized and windowed once, and every unique chunk goes
+    through the sentiment model at most once, no matter how many stages ask
+    for it.
+    """
+
+    def __init__(self, text: str):
+        self.text = text or ''
+        self._windows: Dict[tuple, List[Window]] = {}
+        self._sentiment: Dict[str, Any] = {}
+
+    def windows(self, classifier: Callable, stride: int = WINDOW_STRIDE,
+                max_windows: Optional[int] = MAX_WINDOWS) -> List[Window]:
+        """Token windows sized for the classifier's tokenizer (see chunking.token_windows)"""
+        tokenizer = getattr(classifier, 'tokenizer', None)
+        key = (id(tokenizer), stride, max_windows)
+        if key not in self._windows:
+            self._windows[key] = token_windows(self.text, tokenizer, stride=stride, max_windows=max_windows)
+        return self._windows[key]
+
+    def sentiment(self, chunks: Sequence[str], classifier: Callable,
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> List[Any]:
+        """Classifier output for each chunk, running the model only for unseen chunks"""
+        return score_chunks([self], [chunks], classifier, batch_size)[0]
+
+    @property
+    def forward_passes(self) -> int:
+        """Number of distinct chunks this document has sent through the model"""
+        return len(self._sentiment)
+
+
+def score_chunks(contexts: Sequence[AnalysisContext], chunk_lists: Sequence[Sequence[str]],
+                 classifier: Callable, batch_size: int = DEFAULT_BATCH_SIZE) -> List[List[Any]]:
+    """Fill the sentiment caches of many documents with one batched model run.
+
+    Chunks already cached by their context are skipped, and identical chunks
+    shared by several documents are only scored once.
+    """
+    pending: Dict[str, List[AnalysisContext]] = {}
+    for context, chunks in zip(contexts, chunk_lists):
+        for chunk in chunks:
+            if chunk not in context._sentiment:
+                owners = pending.setdefault(chunk, [])
+                if context not in owners:
+                    owners.append(context)
+
+    if pending:
+        texts = list(pending)
+        for chunk, result in zip(texts, run_batched(classifier, texts, batch_size)):
+            for context in pending[chunk]:
+                context._sentiment[chunk] = result
+
+    return [[context._sentiment[chunk] for chunk in chunks]
+            for context, chunks in zip(contexts, chunk_lists)]
+
+
+def make_contexts(texts: Sequence[str], contexts: Optional[Sequence[AnalysisContext]] = None) -> List[AnalysisContext]:
+    """Return the given contexts, or a fresh one per text"""
+    if contexts is not None:
+        return list(contexts)
+    return [AnalysisContext(text) for text in texts]
@@ -1,15 +1,87 @@
-from bias_model import classify_bias
-from sentiment_model import analyze_sentiment
-from language_flags import detect_loaded_language
+import hashlib
+import json
+import os
+import bias_model
+from bias_model import classify_bias, classify_bias_batch, get_bias_analyzer
+from sentiment_model import (analyze_sentiment, analyze_sentiment_batch, analyze_sentiment_sentences,
+                             analyze_sentiment_sentences_batch, get_sentiment_analyzer)
+from language_flags import LOADED_TERMS, detect_loaded_language, detect_loaded_language_batch, get_nlp
+from batching import DEFAULT_BATCH_SIZE
+from analysis_context import AnalysisContext
+from model_registry import INFERENCE_BACKEND, SENTIMENT_MODEL, loaded_models
+from streaming import analyze_text_stream
 
-def analyze_text(text):
-    bias_score, bias_label = classify_bias(text)
-    sentiment_score, sentiment_label = analyze_sentiment(text)
+# Bump when the shape or meaning of analyze_text results changes
+RESULT_SCHEMA_VERSION = 2
+# Per-sentence scoring costs one extra forward pass per sentence, so it only runs for
+# callers that ask for it (the results heatmap); SENTENCE_SENTIMENT=1 turns it on for all
+SENTENCE_SENTIMENT = os.environ.get('SENTENCE_SENTIMENT', '0') not in ('0', 'false')
+
+def analysis_version():
+    """Identifier of the models, inference backend, lexicons and options behind a result, used to key caches"""
+    lexicons = json.dumps([
+        bias_model.LEFT_BIAS_PATTERNS, bias_model.RIGHT_BIAS_PATTERNS,
+        bias_model.CENTER_BIAS_PATTERNS, bias_model.LOADED_LANGUAGE, LOADED_TERMS,
+    ], sort_keys=True)
+    lexicon_hash = hashlib.sha256(lexicons.encode('utf-8')).hexdigest()[:12]
+    analyzer = get_bias_analyzer()
+    classifier = analyzer.classifier if analyzer.classifier == 'rules' else f"{analyzer.classifier}={analyzer.model_path}"
+    # int8 ONNX scores differ slightly from PyTorch ones, so the backend is part of the version
+    sentences = 'sentences' if SENTENCE_SENTIMENT else 'no-sentences'
+    return f"v{RESULT_SCHEMA_VERSION}:{SENTIMENT_MODEL}:{INFERENCE_BACKEND}:{classifier}:{lexicon_hash}:{sentences}"
+
+def preload():
+    """Load every model now instead of on first request (for servers and workers)"""
+    get_bias_analyzer().load()
+    get_sentiment_analyzer()
+    get_nlp()
+
+def analyze_text(text, deterministic=False, sentences=SENTENCE_SENTIMENT):
+    # One context per document so both stages share the sentiment forward passes
+    context = AnalysisContext(text)
+    bias_score, bias_label = classify_bias(text, context, deterministic)
+    sentiment_score, sentiment_label = analyze_sentiment(text, context, deterministic)
     language_flags = detect_loaded_language(text)
-    return {
+    result = {
         'bias_score': bias_score,
         'bias_label': bias_label,
         'sentiment_score': sentiment_score,
         'sentiment_label': sentiment_label,
         'language_flags': language_flags,
-    } 
\ No newline at end of file
+    }
+    if sentences:
+        _add_sentence_sentiment(result, analyze_sentiment_sentences(text, context=context, deterministic=deterministic))
+    return result
+
+def _add_sentence_sentiment(result, detail):
+    # Per-sentence scores, and their length-weighted document score (no sliding windows involved)
+    result['sentences'] = detail['sentences']
+    result['sentence_sentiment'] = {'score': detail['score'], 'label': detail['label']}
+
+def analyze_text_batch(texts, batch_size=DEFAULT_BATCH_SIZE, deterministic=False, sentences=SENTENCE_SENTIMENT):
+    """Analyze many texts at once; returns one analyze_text result per text.
+    
+    ``sentences`` is one flag for all texts or a sequence with one per text.
+    """
+    contexts = [AnalysisContext(text) for text in texts]
+    biases = classify_bias_batch(texts, batch_size, contexts, deterministic)
+    sentiments = analyze_sentiment_batch(texts, batch_size, contexts, deterministic)
+    flags = detect_loaded_language_batch(texts)
+    results = [
+        {
+            'bias_score': bias_score,
+            'bias_label': bias_label,
+            'sentiment_score': sentiment_score,
+            'sentiment_label': sentiment_label,
+            'language_flags': language_flags,
+        }
+        for (bias_score, bias_label), (sentiment_score, sentiment_label), language_flags
+        in zip(biases, sentiments, flags)
+    ]
+    wanted = [i for i in range(len(texts)) if (sentences[i] if isinstance(sentences, (list, tuple)) else sentences)]
+    if wanted:
+        details = analyze_sentiment_sentences_batch([texts[i] for i in wanted], batch_size,
+                                                    [contexts[i] for i in wanted], deterministic)
+        for i, detail in zip(wanted, details):
+            _add_sentence_sentiment(results[i], detail)
+    return results
@@ -0,0 +1,25 @@
+from typing import Any, Callable, List, Sequence
+
+# Default number of chunks sent through a transformer pipeline per forward pass
+DEFAULT_BATCH_SIZE = 16
+
+
+def run_batched(classifier: Callable, texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[Any]:
+    """Run a HF text-classification pipeline over many texts in padded batches.
+
+    Texts are sorted by length so that each batch is padded to a similar
+    size, and the results are returned in the original input order.
+    """
+    if not texts:
+        return []
+    batch_size = max(1, int(batch_size))
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    results: List[Any] = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        batch = [texts[i] for i in indices]
+        outputs = classifier(batch, batch_size=len(batch), truncation=True)
+        for i, output in zip(indices, outputs):
+            results[i] = output
+    return results
+
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Latency / throughput comparison of the rule-based analyzer and the fine-tuned
+bias classifier on the example articles in test_bias_detection.py.
+
+Usage:
+    python benchmark_bias_engine.py --model-path ./trained_bias_model --batch-sizes 1 8 32
+"""
+
+import argparse
+import json
+import time
+from bias_engine import DEFAULT_MODEL_PATH, FineTunedBiasClassifier
+from bias_model import PoliticalBiasAnalyzer
+from test_bias_detection import TEST_ARTICLES
+
+
+def _time(fn, repeats):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return (time.perf_counter() - start) / repeats, result
+
+
+def _accuracy(labels):
+    correct = sum(1 for label, article in zip(labels, TEST_ARTICLES) if label == article['expected'])
+    return correct / len(TEST_ARTICLES)
+
+
+def run_benchmark(model_path, batch_sizes, repeats=3):
+    texts = [article['text'] for article in TEST_ARTICLES]
+    report = {'documents': len(texts), 'repeats': repeats, 'paths': []}
+
+    rules = PoliticalBiasAnalyzer(classifier='rules').load()
+    seconds, results = _time(lambda: [rules.classify_bias(text, deterministic=True) for text in texts], repeats)
+    report['paths'].append({
+        'path': 'rules (per document)',
+        'ms_per_doc': seconds / len(texts) * 1000,
+        'docs_per_second': len(texts) / seconds,
+        'accuracy': _accuracy([label for _, label, _ in results]),
+    })
+
+    keywords_only = PoliticalBiasAnalyzer(classifier='rules')
+    seconds, results = _time(lambda: [keywords_only.analyze_political_keywords(text) for text in texts], repeats)
+    report['paths'].append({
+        'path': 'rules (keywords only)',
+        'ms_per_doc': seconds / len(texts) * 1000,
+        'docs_per_second': len(texts) / seconds,
+        'accuracy': _accuracy([label for _, label, _ in results]),
+    })
+
+    engine = FineTunedBiasClassifier(model_path)
+    for batch_size in batch_sizes:
+        seconds, results = _time(lambda: engine.predict(texts, batch_size=batch_size), repeats)
+        report['paths'].append({
+            'path': f'fine-tuned (batch_size={batch_size})',
+            'ms_per_doc': seconds / len(texts) * 1000,
+            'docs_per_second': len(texts) / seconds,
+            'accuracy': _accuracy([result['label'] for result in results]),
+        })
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare rule-based and fine-tuned bias classifiers')
+    parser.add_argument('--model-path', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    report = run_benchmark(args.model_path, args.batch_sizes, args.repeats)
+
+    print("⏱️  Bias Classifier Benchmark")
+    print("=" * 60)
+    print(f"{'Path':<32}{'ms/doc':>10}{'docs/s':>10}{'acc':>8}")
+    for row in report['paths']:
+        print(f"{row['path']:<32}{row['ms_per_doc']:>10.2f}{row['docs_per_second']:>10.1f}{row['accuracy']:>8.2f}")
+
+    with open('bias_engine_benchmark.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Detailed results saved to: bias_engine_benchmark.json")
+
+
+if __name__ == "__main__":
+    main()
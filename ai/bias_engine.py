@@ -0,0 +1,60 @@
+import os
+from typing import Dict, List, Optional, Sequence
+from batching import DEFAULT_BATCH_SIZE
+
+# Where train_bias_model.py saves its checkpoint
+DEFAULT_MODEL_PATH = os.environ.get('BIAS_MODEL_PATH', './trained_bias_model')
+# torch intra-op threads for inference; 0 keeps the torch default
+INFERENCE_THREADS = int(os.environ.get('BIAS_MODEL_THREADS', 0))
+
+# Position of each label on the 0 (Left) .. 1 (Right) bias scale
+LABEL_POSITIONS = {'Left': 0.0, 'Center': 0.5, 'Right': 1.0}
+
+
+class FineTunedBiasClassifier:
+    """Inference engine for the Left/Center/Right model from train_bias_model.py.
+
+    Texts are sorted by length and tokenized per batch with dynamic padding
+    (to the longest text in the batch, not to 512), then run without autograd
+    on a fixed number of CPU threads.
+    """
+
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, num_threads: int = INFERENCE_THREADS,
+                 max_length: int = 512, device: Optional[str] = None):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self._torch = torch
+        self.model_path = model_path
+        self.max_length = max_length
+        self.device = device or 'cpu'
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_path).to(self.device)
+        self.model.eval()
+        self.id2label = {int(k): v for k, v in self.model.config.id2label.items()}
+
+    def predict(self, texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[Dict]:
+        """Return label, score (0 = Left .. 1 = Right) and class probabilities per text"""
+        if not texts:
+            return []
+        torch = self._torch
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        predictions: List[Optional[Dict]] = [None] * len(texts)
+
+        with torch.inference_mode():
+            for start in range(0, len(order), max(1, batch_size)):
+                indices = order[start:start + batch_size]
+                encoded = self.tokenizer([texts[i] for i in indices], padding='longest', truncation=True,
+                                         max_length=self.max_length, return_tensors='pt').to(self.device)
+                probs = torch.softmax(self.model(**encoded).logits, dim=-1).cpu().tolist()
+                for i, row in zip(indices, probs):
+                    predictions[i] = self._prediction(row)
+        return predictions
+
+    def _prediction(self, probs: List[float]) -> Dict:
+        probabilities = {self.id2label[i]: p for i, p in enumerate(probs)}
+        label = max(probabilities, key=probabilities.get)
+        score = sum(LABEL_POSITIONS.get(name, 0.5) * p for name, p in probabilities.items())
+        return {'label': label, 'score': score, 'probabilities': probabilities}
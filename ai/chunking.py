@@ -0,0 +1,115 @@
+import os
+from typing import List, NamedTuple, Optional
+
+# Character budget of one legacy sentiment chunk
+CHUNK_LENGTH = 512
+# Overlap between consecutive windows, in tokens
+WINDOW_STRIDE = int(os.environ.get('SENTIMENT_WINDOW_STRIDE', 64))
+# Upper bound on windows scored per document, to keep latency bounded
+MAX_WINDOWS = int(os.environ.get('SENTIMENT_MAX_WINDOWS', 16))
+# Used when the tokenizer does not advertise a sensible model_max_length
+DEFAULT_MAX_TOKENS = 512
+
+
+def split_text_into_chunks(text: str, max_length: int) -> List[str]:
+    """Split text into whitespace-joined chunks of at most max_length characters"""
+    words = text.split()
+    chunks = []
+    current_chunk = []
+    current_length = 0
+
+    for word in words:
+        if current_length + len(word) + 1 > max_length:
+            if current_chunk:
+                chunks.append(' '.join(current_chunk))
+            current_chunk = [word]
+            current_length = len(word)
+        else:
+            current_chunk.append(word)
+            current_length += len(word) + 1
+
+    if current_chunk:
+        chunks.append(' '.join(current_chunk))
+
+    return chunks
+
+
+class Window(NamedTuple):
+    """A slice of the document that fits in one forward pass"""
+    text: str
+    start: int
+    end: int
+    n_tokens: int
+
+
+def window_budget(tokenizer) -> int:
+    """Number of content tokens per window (model limit minus special tokens)"""
+    limit = getattr(tokenizer, 'model_max_length', DEFAULT_MAX_TOKENS) or DEFAULT_MAX_TOKENS
+    if limit > 100000:
+        # Tokenizers without a configured limit report a huge sentinel value
+        limit = DEFAULT_MAX_TOKENS
+    try:
+        special = tokenizer.num_special_tokens_to_add(pair=False)
+    except Exception:
+        special = 2
+    return max(1, limit - special)
+
+
+def token_windows(text: str, tokenizer, max_tokens: Optional[int] = None,
+                  stride: int = WINDOW_STRIDE, max_windows: Optional[int] = MAX_WINDOWS) -> List[Window]:
+    """Split text into overlapping windows packed up to the model's token limit.
+
+    Token boundaries come from the tokenizer's offset mapping, so each window
+    is an exact character slice of the original text. When the document needs
+    more than ``max_windows`` windows, an evenly spaced subset is kept so the
+    whole article is still represented.
+    """
+    if not text or not text.strip():
+        return []
+    if tokenizer is None:
+        return _character_windows(text, max_windows)
+
+    max_tokens = max_tokens or window_budget(tokenizer)
+    try:
+        encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True,
+                             truncation=False, verbose=False)
+        offsets = encoding['offset_mapping']
+    except Exception:
+        # Slow (pure Python) tokenizers cannot report offsets
+        return _character_windows(text, max_windows)
+    if not offsets:
+        return []
+
+    step = max(1, max_tokens - max(0, min(stride, max_tokens - 1)))
+    windows = []
+    for first in range(0, len(offsets), step):
+        last = min(first + max_tokens, len(offsets)) - 1
+        start, end = offsets[first][0], offsets[last][1]
+        windows.append(Window(text[start:end], start, end, last - first + 1))
+        if last == len(offsets) - 1:
+            break
+    return _cap(windows, max_windows)
+
+
+def _character_windows(text: str, max_windows: Optional[int]) -> List[Window]:
+    """Fallback windows built from the legacy character-based chunker.
+
+    Chunks are whitespace-normalized, so start/end are approximate and
+    n_tokens is a word count.
+    """
+    windows = []
+    position = 0
+    for chunk in split_text_into_chunks(text, CHUNK_LENGTH):
+        windows.append(Window(chunk, position, position + len(chunk), len(chunk.split())))
+        position += len(chunk) + 1
+    return _cap(windows, max_windows)
+
+
+def _cap(windows: List[Window], max_windows: Optional[int]) -> List[Window]:
+    if not max_windows or len(windows) <= max_windows:
+        return windows
+    if max_windows == 1:
+        return windows[:1]
+    last = len(windows) - 1
+    picks = sorted({round(i * last / (max_windows - 1)) for i in range(max_windows)})
+    return [windows[i] for i in picks]
@@ -1,11 +1,36 @@
-import spacy
+import os
 import re
+from lazy import LazyLoader
+from pattern_matcher import PatternMatcher
 
-try:
-    nlp = spacy.load('en_core_web_sm')
-except OSError:
-    # Fallback if spacy model not available
-    nlp = None
+SPACY_MODEL = 'en_core_web_sm'
+# Matching only uses tokens, so every trained component is left out of the pipeline
+UNUSED_COMPONENTS = ['tok2vec', 'tagger', 'parser', 'senter', 'attribute_ruler', 'lemmatizer', 'ner']
+# Longest piece of text handed to spaCy at once; longer inputs are split
+MAX_CHUNK_CHARS = int(os.environ.get('LANGUAGE_FLAGS_MAX_CHUNK_CHARS', 100000))
+# Defaults for nlp.pipe in detect_loaded_language_batch
+PIPE_BATCH_SIZE = 64
+PIPE_N_PROCESS = int(os.environ.get('LANGUAGE_FLAGS_N_PROCESS', 1))
+
+def _load_nlp():
+    try:
+        import spacy
+        return spacy.load(SPACY_MODEL, exclude=UNUSED_COMPONENTS)
+    except (ImportError, OSError):
+        # Fallback if spacy model not available
+        return None
+
+_nlp = LazyLoader(_load_nlp)
+
+def get_nlp():
+    """Return the tokenizer-only spaCy pipeline (or None if unavailable), loading it on first use"""
+    return _nlp.get()
+
+def __getattr__(name):
+    # Keep `language_flags.nlp` working without import-time loading
+    if name == 'nlp':
+        return get_nlp()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Comprehensive list of loaded language terms
 LOADED_TERMS = [
@@ -32,54 +57,133 @@ LOADED_TERMS = [
     'elite', 'ordinary people', 'real americans', 'coastal elites'
 ]
 
+# Single-pass automaton over every term, used when spaCy is unavailable
+TERM_MATCHER = PatternMatcher()
+TERM_MATCHER.add_all(LOADED_TERMS)
+TERM_MATCHER.build()
+
+# Number of flags returned per document
+MAX_FLAGS = 5
+
+def _build_phrase_matcher():
+    nlp = get_nlp()
+    if nlp is None:
+        return None
+    try:
+        from spacy.matcher import PhraseMatcher
+        matcher = PhraseMatcher(nlp.vocab, attr='LOWER')
+        matcher.add('LOADED_TERM', [nlp.make_doc(term) for term in LOADED_TERMS])
+        return matcher
+    except Exception as e:
+        print(f"Warning: Could not build spaCy phrase matcher: {e}")
+        return None
+
+_phrase_matcher = LazyLoader(_build_phrase_matcher)
+
+def split_for_spacy(text, max_chars=MAX_CHUNK_CHARS, overlap=None):
+    """Split text into (offset, chunk) pieces of at most max_chars, cut at whitespace.
+    
+    Each piece after the first starts up to ``overlap`` characters (default:
+    the longest loaded term) before the previous cut, on a word boundary, so
+    a term crossing a cut is whole in the next piece. Matches inside the
+    overlap are found twice; callers drop the repeats by offset.
+    """
+    if overlap is None:
+        overlap = TERM_MATCHER.max_phrase_length
+    pieces = []
+    start = 0
+    while len(text) - start > max_chars:
+        cut = text.rfind(' ', start, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars
+        pieces.append((start, text[start:cut]))
+        # The space before the overlap, so the next piece starts with a whole word
+        resume = text.rfind(' ', start + 1, max(start + 1, cut - overlap))
+        start = resume if resume > start else max(start + 1, cut - overlap)
+    pieces.append((start, text[start:]))
+    return pieces
+
 def detect_loaded_language(text):
     """Detect loaded language in text"""
-    if not text or len(text.strip()) < 10:
-        return []
+    return detect_loaded_language_batch([text])[0]
+
+def find_loaded_terms(text):
+    """Every loaded-term occurrence in text, in order, with character offsets"""
+    return find_loaded_terms_batch([text])[0]
+
+def detect_loaded_language_batch(texts, batch_size=PIPE_BATCH_SIZE, n_process=PIPE_N_PROCESS):
+    """Detect loaded language in many texts; returns the top unique flags per text"""
+    return [_top_flags(hits) for hits in find_loaded_terms_batch(texts, batch_size, n_process)]
+
+def find_loaded_terms_batch(texts, batch_size=PIPE_BATCH_SIZE, n_process=PIPE_N_PROCESS):
+    """Find every loaded-term occurrence (single and multi-word) in many texts.
     
-    flags = []
-    text_lower = text.lower()
+    Uses a spaCy PhraseMatcher over tokenizer-only docs from one nlp.pipe
+    pass, or the PatternMatcher automaton if spaCy is unavailable. Oversized
+    texts are split into chunks of at most MAX_CHUNK_CHARS so spaCy's memory
+    use stays bounded; offsets are mapped back to the original text.
+    """
+    results = [[] for _ in texts]
+    valid = [i for i, text in enumerate(texts) if text and len(text.strip()) >= 10]
+    if not valid:
+        return results
+    
+    nlp = get_nlp()
+    matcher = _phrase_matcher.get() if nlp is not None else None
     
     # Simple pattern matching if spacy is not available
-    if nlp is None:
-        for term in LOADED_TERMS:
-            if term in text_lower:
-                # Find the context around the term
-                start = text_lower.find(term)
-                if start != -1:
-                    # Get surrounding context
-                    context_start = max(0, start - 50)
-                    context_end = min(len(text), start + len(term) + 50)
-                    snippet = text[context_start:context_end].strip()
-                    flags.append({'snippet': snippet, 'term': term})
-        return flags[:5]  # Limit to 5 flags
+    if matcher is None:
+        for i in valid:
+            results[i] = _match_terms(texts[i])
+        return results
     
     # Use spacy for more sophisticated analysis
     try:
-        doc = nlp(text)
-        for i, token in enumerate(doc):
-            if token.text.lower() in LOADED_TERMS:
-                # Get context around the loaded term
-                start_idx = max(0, i-2)
-                end_idx = min(len(doc), i+3)
-                snippet = ' '.join([t.text for t in doc[start_idx:end_idx]])
-                flags.append({
-                    'snippet': snippet, 
-                    'term': token.text.lower(),
-                    'index': token.idx
-                })
+        pieces = ((chunk, (i, offset)) for i in valid for offset, chunk in split_for_spacy(texts[i]))
+        # Matching only needs tokens, so every pipeline component is skipped
+        with nlp.select_pipes(disable=nlp.pipe_names):
+            seen = [set() for _ in texts]
+            for doc, (i, offset) in nlp.pipe(pieces, as_tuples=True, batch_size=batch_size, n_process=n_process):
+                for flag in _flags_from_doc(doc, matcher, offset):
+                    # Pieces overlap, so a term near a cut can be matched twice
+                    if (flag['index'], flag['end']) not in seen[i]:
+                        seen[i].add((flag['index'], flag['end']))
+                        results[i].append(flag)
     except Exception as e:
         print(f"Error in spacy analysis: {e}")
         # Fallback to simple matching
-        for term in LOADED_TERMS:
-            if term in text_lower:
-                start = text_lower.find(term)
-                if start != -1:
-                    context_start = max(0, start - 50)
-                    context_end = min(len(text), start + len(term) + 50)
-                    snippet = text[context_start:context_end].strip()
-                    flags.append({'snippet': snippet, 'term': term})
+        for i in valid:
+            results[i] = _match_terms(texts[i])
     
+    return results
+
+def _flags_from_doc(doc, matcher, offset=0):
+    flags = []
+    for _, start, end in matcher(doc):
+        span = doc[start:end]
+        # Get context around the loaded term
+        start_idx = max(0, start-2)
+        end_idx = min(len(doc), end+2)
+        snippet = ' '.join([t.text for t in doc[start_idx:end_idx]])
+        flags.append({
+            'snippet': snippet, 
+            'term': span.text.lower(),
+            'index': offset + span.start_char,
+            'end': offset + span.end_char
+        })
+    return flags
+
+def _match_terms(text):
+    flags = []
+    for start, end, term in TERM_MATCHER.finditer(text):
+        # Get surrounding context
+        context_start = max(0, start - 50)
+        context_end = min(len(text), end + 50)
+        snippet = text[context_start:context_end].strip()
+        flags.append({'snippet': snippet, 'term': term, 'index': start, 'end': end})
+    return flags
+
+def _top_flags(flags, limit=MAX_FLAGS):
     # Remove duplicates and limit results
     unique_flags = []
     seen_snippets = set()
@@ -87,5 +191,7 @@ def detect_loaded_language(text):
         if flag['snippet'] not in seen_snippets:
             unique_flags.append(flag)
             seen_snippets.add(flag['snippet'])
+            if len(unique_flags) == limit:
+                break
     
-    return unique_flags[:5]  # Return top 5 loaded language instances 
\ No newline at end of file
+    return unique_flags  # Return top loaded language instances
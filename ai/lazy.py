@@ -0,0 +1,52 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# Seconds a failed load is remembered before the factory is tried again
+RETRY_AFTER = 300
+
+
+class LazyLoader:
+    """Thread-safe, load-once holder for expensive objects such as models.
+
+    The factory runs the first time ``get()`` is called; concurrent callers
+    block until it finishes and then share the same instance. Whatever the
+    factory returns (including None for "unavailable") is cached. If the
+    factory raises, calls within ``retry_after`` seconds raise the same
+    exception again instead of repeating a load that just failed.
+    """
+
+    def __init__(self, factory: Callable[[], Any], retry_after: float = RETRY_AFTER):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value = None
+        self.retry_after = retry_after
+        self._error: Optional[BaseException] = None
+        self._failed_at = 0.0
+
+    def get(self) -> Any:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if self._error is not None and time.monotonic() - self._failed_at < self.retry_after:
+                        raise self._error
+                    try:
+                        self._value = self._factory()
+                    except Exception as e:
+                        self._error, self._failed_at = e, time.monotonic()
+                        raise
+                    self._error = None
+                    self._loaded = True
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def reset(self) -> None:
+        """Drop the cached instance so the next get() loads it again"""
+        with self._lock:
+            self._value = None
+            self._loaded = False
+            self._error = None
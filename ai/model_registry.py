@@ -0,0 +1,101 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from lazy import LazyLoader
+
+# Checkpoint used by both sentiment stages (the HF default for 'sentiment-analysis')
+SENTIMENT_MODEL = 'distilbert-base-uncased-finetuned-sst-2-english'
+
+# -1 runs on CPU; set MODEL_DEVICE=0 to use the first GPU
+DEFAULT_DEVICE = int(os.environ.get('MODEL_DEVICE', -1))
+
+# 'torch' (eager PyTorch pipelines) or 'onnx' (int8 ONNX Runtime, CPU only)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch').lower()
+
+# Tasks the ONNX backend can serve
+ONNX_TASKS = ('sentiment-analysis', 'text-classification')
+
+
+class ModelRegistry:
+    """Process-wide cache that hands out one pipeline per (task, model, device).
+
+    Every caller asking for the same key shares one set of weights and one
+    tokenizer; each entry is loaded lazily and at most once. With the 'onnx'
+    backend, CPU classification pipelines are served by ONNX Runtime and fall
+    back to PyTorch if that fails.
+    """
+
+    def __init__(self, backend: str = INFERENCE_BACKEND):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str, int], LazyLoader] = {}
+
+    def get_pipeline(self, task: str, model: str, device: Optional[int] = None):
+        key = (task, model, DEFAULT_DEVICE if device is None else device)
+        with self._lock:
+            loader = self._entries.get(key)
+            if loader is None:
+                loader = LazyLoader(lambda: self._load(*key))
+                self._entries[key] = loader
+        return loader.get()
+
+    def _load(self, task: str, model: str, device: int):
+        if self.backend == 'onnx' and task in ONNX_TASKS and device < 0:
+            try:
+                from onnx_backend import load_classifier
+                return load_classifier(model)
+            except Exception as e:
+                print(f"Warning: ONNX backend unavailable for {model}, using PyTorch: {e}")
+        from transformers import pipeline
+        return pipeline(task, model=model, device=device)
+
+    def loaded_models(self) -> List[Dict]:
+        """Describe every loaded pipeline and the memory held by its weights"""
+        with self._lock:
+            entries = list(self._entries.items())
+        report = []
+        for (task, model, device), loader in entries:
+            if not loader.loaded:
+                continue
+            pipe = loader.get()
+            parameters, memory_bytes = _model_footprint(pipe)
+            report.append({
+                'task': task,
+                'model': model,
+                'device': device,
+                'backend': 'onnx' if hasattr(pipe, 'session') else 'torch',
+                'parameters': parameters,
+                'memory_bytes': memory_bytes,
+            })
+        return report
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _model_footprint(pipe) -> Tuple[int, int]:
+    """Count parameters and bytes held by a pipeline's model weights and buffers"""
+    if hasattr(pipe, 'memory_bytes'):
+        # ONNX sessions: size of the serialized (possibly int8) weights
+        return 0, pipe.memory_bytes
+    model = getattr(pipe, 'model', None)
+    if model is None or not hasattr(model, 'parameters'):
+        return 0, 0
+    parameters = 0
+    memory_bytes = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        parameters += tensor.numel()
+        memory_bytes += tensor.numel() * tensor.element_size()
+    return parameters, memory_bytes
+
+
+registry = ModelRegistry()
+
+def get_pipeline(task: str, model: str, device: Optional[int] = None):
+    """Shortcut for registry.get_pipeline"""
+    return registry.get_pipeline(task, model, device)
+
+def loaded_models() -> List[Dict]:
+    """Shortcut for registry.loaded_models"""
+    return registry.loaded_models()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+ONNX Runtime backend for the sequence-classification models.
+
+Exports a Hugging Face checkpoint (the SST-2 sentiment model or a model saved
+by train_bias_model.py) to ONNX, applies dynamic int8 quantization and serves
+it through an object that behaves like a transformers text-classification
+pipeline. Select it with INFERENCE_BACKEND=onnx; the model registry falls back
+to PyTorch when onnxruntime is missing or the export fails.
+
+Usage:
+    python onnx_backend.py export --model distilbert-base-uncased-finetuned-sst-2-english
+    python onnx_backend.py parity --model ./trained_bias_model
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+# Where exported models are written, one sub-directory per checkpoint
+ONNX_MODEL_DIR = os.environ.get('ONNX_MODEL_DIR', './models/onnx')
+# intra-op threads per session; 0 lets onnxruntime decide
+ONNX_THREADS = int(os.environ.get('ONNX_THREADS', 0))
+
+FP32_FILE = 'model.onnx'
+INT8_FILE = 'model.int8.onnx'
+
+
+def export_dir(model: str) -> str:
+    """Cache directory for the exported copy of a checkpoint"""
+    return os.path.join(ONNX_MODEL_DIR, re.sub(r'[^A-Za-z0-9_.-]+', '_', model.strip('./')))
+
+
+def export_model(model: str, output_dir: Optional[str] = None, quantize: bool = True) -> str:
+    """Export a sequence-classification checkpoint to ONNX (optionally int8)"""
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    output_dir = output_dir or export_dir(model)
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model)
+    hf_model = AutoModelForSequenceClassification.from_pretrained(model)
+    hf_model.eval()
+
+    sample = tokenizer(['export sample'], return_tensors='pt')
+    fp32_path = os.path.join(output_dir, FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            hf_model,
+            (sample['input_ids'], sample['attention_mask']),
+            fp32_path,
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['logits'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'logits': {0: 'batch'},
+            },
+            opset_version=14,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(output_dir, INT8_FILE), weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, 'labels.json'), 'w') as f:
+        json.dump({str(k): v for k, v in hf_model.config.id2label.items()}, f)
+
+    return output_dir
+
+
+class OnnxTextClassifier:
+    """Drop-in replacement for a HF text-classification pipeline on ONNX Runtime.
+
+    Calling it with a string or a list of strings returns a list of
+    ``{'label', 'score'}`` dicts, like ``pipeline('sentiment-analysis')``.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = True, max_length: int = 512):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_dir = model_dir
+        self.max_length = max_length
+        self.model_file = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        with open(os.path.join(model_dir, 'labels.json')) as f:
+            self.id2label = {int(k): v for k, v in json.load(f).items()}
+
+        options = ort.SessionOptions()
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = ort.InferenceSession(self.model_file, options, providers=['CPUExecutionProvider'])
+        self.memory_bytes = os.path.getsize(self.model_file)
+
+    def __call__(self, inputs, batch_size: Optional[int] = None, **kwargs) -> List[Dict]:
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        batch_size = batch_size or len(texts) or 1
+        results = []
+        for start in range(0, len(texts), batch_size):
+            results.extend(self._classify(texts[start:start + batch_size]))
+        return results
+
+    def _classify(self, texts: Sequence[str]) -> List[Dict]:
+        encoded = self.tokenizer(list(texts), padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors='np')
+        logits = self.session.run(['logits'], {
+            'input_ids': encoded['input_ids'].astype(np.int64),
+            'attention_mask': encoded['attention_mask'].astype(np.int64),
+        })[0]
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probs = exp / exp.sum(axis=-1, keepdims=True)
+        best = probs.argmax(axis=-1)
+        return [{'label': self.id2label[int(i)], 'score': float(p[i])} for i, p in zip(best, probs)]
+
+
+def load_classifier(model: str, quantized: bool = True) -> OnnxTextClassifier:
+    """Load the exported model, exporting it first if it is not cached yet"""
+    model_dir = export_dir(model)
+    if not os.path.exists(os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)):
+        export_model(model, model_dir, quantize=quantized)
+    return OnnxTextClassifier(model_dir, quantized=quantized)
+
+
+def check_parity(model: str, texts: Sequence[str], quantized: bool = True) -> Dict:
+    """Compare ONNX and PyTorch outputs on the same texts.
+
+    Reports label agreement, score drift and per-text latency for both paths.
+    """
+    from transformers import pipeline
+
+    torch_classifier = pipeline('text-classification', model=model)
+    onnx_classifier = load_classifier(model, quantized)
+
+    start = time.perf_counter()
+    torch_results = [torch_classifier(text, truncation=True)[0] for text in texts]
+    torch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    onnx_results = [onnx_classifier(text)[0] for text in texts]
+    onnx_seconds = time.perf_counter() - start
+
+    agree = sum(1 for a, b in zip(torch_results, onnx_results) if a['label'] == b['label'])
+    drift = [abs(a['score'] - b['score']) for a, b in zip(torch_results, onnx_results) if a['label'] == b['label']]
+    n = len(texts) or 1
+    return {
+        'model': model,
+        'quantized': quantized,
+        'texts': len(texts),
+        'label_agreement': agree / n,
+        'mean_score_drift': float(np.mean(drift)) if drift else 0.0,
+        'max_score_drift': float(np.max(drift)) if drift else 0.0,
+        'torch_ms_per_text': torch_seconds / n * 1000,
+        'onnx_ms_per_text': onnx_seconds / n * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export and check ONNX classification models')
+    parser.add_argument('command', choices=['export', 'parity'])
+    parser.add_argument('--model', default='distilbert-base-uncased-finetuned-sst-2-english')
+    parser.add_argument('--fp32', action='store_true', help='skip int8 quantization')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        path = export_model(args.model, quantize=not args.fp32)
+        print(f"✅ Exported {args.model} to {path}")
+    else:
+        from test_bias_detection import TEST_ARTICLES
+        report = check_parity(args.model, [article['text'] for article in TEST_ARTICLES], quantized=not args.fp32)
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
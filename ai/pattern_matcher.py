@@ -0,0 +1,115 @@
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton that finds many phrases in a single pass.
+
+    Phrases are matched case-insensitively on whole-word boundaries, so
+    'right' matches "the right thing" but not "rights" or "bright". Each
+    phrase can carry any number of payloads (e.g. a category and weight);
+    every payload added for a phrase is reported with its hits.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        self._payloads: Dict[str, List[Any]] = {}
+        self._built = False
+
+    def add(self, phrase: str, payload: Any = None) -> None:
+        """Register a phrase (and an optional payload) with the matcher"""
+        phrase = phrase.lower().strip()
+        if not phrase:
+            return
+        if phrase not in self._payloads:
+            self._payloads[phrase] = []
+            node = 0
+            for ch in phrase:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[node][ch] = nxt
+                node = nxt
+            self._output[node].append(phrase)
+            self._built = False
+        if payload is not None:
+            self._payloads[phrase].append(payload)
+
+    def add_all(self, phrases: Iterable[str], payload: Any = None) -> None:
+        for phrase in phrases:
+            self.add(phrase, payload)
+
+    def build(self) -> 'PatternMatcher':
+        """Compute failure links; called automatically before the first match"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+        self._built = True
+        return self
+
+    @property
+    def phrases(self) -> List[str]:
+        return list(self._payloads)
+
+    @property
+    def max_phrase_length(self) -> int:
+        return max((len(p) for p in self._payloads), default=0)
+
+    def payloads(self, phrase: str) -> List[Any]:
+        return self._payloads.get(phrase, [])
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield (start, end, phrase) for every whole-word occurrence in text.
+
+        Offsets index into text itself: characters are lowercased one at a
+        time, as some ('İ') lowercase to more than one character.
+        """
+        if not self._built:
+            self.build()
+        goto, fail, output = self._goto, self._fail, self._output
+        n = len(text)
+        # Index in text of each lowercased character fed to the automaton
+        origin: List[int] = []
+        node = 0
+        for index, original in enumerate(text):
+            for ch in original.lower():
+                origin.append(index)
+                while node and ch not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(ch, 0)
+                if not output[node]:
+                    continue
+                for phrase in output[node]:
+                    start = origin[len(origin) - len(phrase)]
+                    end = index + 1
+                    if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(phrase[0]):
+                        continue
+                    if end < n and _is_word_char(text[end]) and _is_word_char(phrase[-1]):
+                        continue
+                    yield start, end, phrase
+
+    def findall(self, text: str) -> List[Tuple[int, int, str]]:
+        return list(self.finditer(text))
+
+    def matched_phrases(self, text: str) -> set:
+        """Return the set of distinct phrases present in text"""
+        return {phrase for _, _, phrase in self.finditer(text)}
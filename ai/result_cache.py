@@ -0,0 +1,134 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a document for cache keys (whitespace-insensitive)"""
+    return _WHITESPACE.sub(' ', text or '').strip()
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the normalized text"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache of analysis results keyed on content hash and version.
+
+    The first tier is an in-process LRU bounded by ``max_entries`` and
+    ``ttl`` seconds. If a ``redis_url`` is given, results are also written to
+    Redis (with the same TTL) so that other API and worker processes can
+    reuse them. Redis errors disable that tier instead of failing analysis.
+    """
+
+    def __init__(self, version: str, max_entries: int = 1024, ttl: Optional[float] = 3600,
+                 redis_url: Optional[str] = None, key_prefix: str = 'biased:analysis'):
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0,
+                       'redis_hits': 0, 'redis_errors': 0}
+        self._redis = None
+        if redis_url:
+            try:
+                from redis import Redis
+                self._redis = Redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+            except Exception as e:
+                print(f"Warning: Redis result cache disabled: {e}")
+
+    def key(self, text: str) -> str:
+        return f"{self.version}:{content_hash(text)}"
+
+    def get(self, text: str) -> Optional[Dict]:
+        key = self.key(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+                self._stats['expirations'] += 1
+
+        value = self._redis_get(key)
+        with self._lock:
+            if value is not None:
+                self._stats['hits'] += 1
+                self._stats['redis_hits'] += 1
+                self._store(key, value)
+            else:
+                self._stats['misses'] += 1
+        return value
+
+    def set(self, text: str, value: Dict) -> None:
+        key = self.key(text)
+        with self._lock:
+            self._store(key, value)
+        self._redis_set(key, value)
+
+    def get_or_compute(self, text: str, compute: Callable[[], Dict]) -> Dict:
+        value = self.get(text)
+        if value is None:
+            value = compute()
+            self.set(text, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        stats['redis'] = self._redis is not None
+        return stats
+
+    def _store(self, key: str, value: Dict) -> None:
+        expires_at = time.time() + self.ttl if self.ttl else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _redis_get(self, key: str) -> Optional[Dict]:
+        if self._redis is None:
+            return None
+        try:
+            raw = self._redis.get(f"{self.key_prefix}:{key}")
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+
+    def _redis_set(self, key: str, value: Dict) -> None:
+        if self._redis is None:
+            return
+        try:
+            payload = json.dumps(value)
+            if self.ttl:
+                self._redis.setex(f"{self.key_prefix}:{key}", int(self.ttl), payload)
+            else:
+                self._redis.set(f"{self.key_prefix}:{key}", payload)
+        except Exception as e:
+            self._redis_failed(e)
+
+    def _redis_failed(self, error: Exception) -> None:
+        print(f"Warning: Redis result cache disabled: {error}")
+        self._redis = None
+        with self._lock:
+            self._stats['redis_errors'] += 1
@@ -1,52 +1,190 @@
-from transformers import pipeline
+import os
 import random
+import re
+from batching import DEFAULT_BATCH_SIZE
+from analysis_context import AnalysisContext, make_contexts, score_chunks
+from chunking import Window
+from model_registry import SENTIMENT_MODEL, get_pipeline
 
-sentiment_analyzer = pipeline('sentiment-analysis')
+# Emotional words that nudge the model's score
+POSITIVE_WORDS = ['great', 'amazing', 'wonderful', 'excellent', 'fantastic', 'brilliant']
+NEGATIVE_WORDS = ['terrible', 'awful', 'horrible', 'disastrous', 'catastrophic', 'devastating']
 
-def analyze_sentiment(text):
+# A sentence ends at terminal punctuation (plus closing quotes/brackets) followed by
+# whitespace, or at a line break; "3.5" and "e.g.," do not end a sentence
+SENTENCE_PATTERN = re.compile(r'\S.*?(?:[.!?]+["\'\u201d\u2019)\]]*(?=\s|$)|$)', re.MULTILINE)
+# Upper bound on sentences scored per document, to keep latency bounded
+MAX_SENTENCES = int(os.environ.get('SENTIMENT_MAX_SENTENCES', 256))
+
+def get_sentiment_analyzer():
+    """Return the shared sentiment pipeline, loading it on first use"""
+    # Same registry entry as PoliticalBiasAnalyzer, so both stages share one model
+    return get_pipeline('sentiment-analysis', SENTIMENT_MODEL)
+
+def __getattr__(name):
+    # Keep `sentiment_model.sentiment_analyzer` working without import-time loading
+    if name == 'sentiment_analyzer':
+        return get_sentiment_analyzer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def analyze_sentiment(text, context=None, deterministic=False):
     if not text or len(text.strip()) < 10:
         return 0.0, 'Neutral'
-    
+
     try:
-        result = sentiment_analyzer(text[:512])[0]
-        label = result['label']
-        score = float(result['score'])
-        
-        # Map sentiment scores to more realistic ranges
-        if label == 'POSITIVE':
-            # Positive sentiment: 0.1 to 0.9
-            sentiment_score = 0.1 + (score * 0.8)
-            sentiment_label = 'Positive'
-        elif label == 'NEGATIVE':
-            # Negative sentiment: -0.9 to -0.1
-            sentiment_score = -0.9 + (score * 0.8)
-            sentiment_label = 'Negative'
-        else:
-            # Neutral sentiment: -0.1 to 0.1
-            sentiment_score = random.uniform(-0.1, 0.1)
-            sentiment_label = 'Neutral'
-        
-        # Add some variation based on text content
-        text_lower = text.lower()
-        
-        # Check for emotional words that might affect sentiment
-        positive_words = ['great', 'amazing', 'wonderful', 'excellent', 'fantastic', 'brilliant']
-        negative_words = ['terrible', 'awful', 'horrible', 'disastrous', 'catastrophic', 'devastating']
-        
-        pos_count = sum(1 for word in positive_words if word in text_lower)
-        neg_count = sum(1 for word in negative_words if word in text_lower)
-        
-        if pos_count > neg_count:
-            sentiment_score += 0.1
-        elif neg_count > pos_count:
-            sentiment_score -= 0.1
-        
-        # Clamp score to valid range
-        sentiment_score = max(-1.0, min(1.0, sentiment_score))
-        
-        return sentiment_score, sentiment_label
-        
+        # Windows are scored through the shared context, so forward passes
+        # already run by the bias stage are reused
+        context = context or AnalysisContext(text)
+        classifier = get_sentiment_analyzer()
+        windows = context.windows(classifier)
+        result = aggregate_window_sentiment(windows, context.sentiment([w.text for w in windows], classifier))
+        return _map_sentiment(text, result, deterministic)
+
     except Exception as e:
         print(f"Error in sentiment analysis: {e}")
         # Fallback to neutral
-        return 0.0, 'Neutral' 
\ No newline at end of file
+        return 0.0, 'Neutral'
+
+def analyze_sentiment_batch(texts, batch_size=DEFAULT_BATCH_SIZE, contexts=None, deterministic=False):
+    """Batched counterpart of analyze_sentiment; returns one result per text"""
+    outputs = [(0.0, 'Neutral')] * len(texts)
+    contexts = make_contexts(texts, contexts)
+    valid = [i for i, text in enumerate(texts) if text and len(text.strip()) >= 10]
+    if not valid:
+        return outputs
+
+    try:
+        classifier = get_sentiment_analyzer()
+        window_lists = [contexts[i].windows(classifier) for i in valid]
+        results = score_chunks([contexts[i] for i in valid],
+                               [[w.text for w in windows] for windows in window_lists],
+                               classifier, batch_size)
+        for i, windows, doc_results in zip(valid, window_lists, results):
+            outputs[i] = _map_sentiment(texts[i], aggregate_window_sentiment(windows, doc_results), deterministic)
+    except Exception as e:
+        print(f"Error in sentiment analysis: {e}")
+
+    return outputs
+
+def split_sentences(text, max_sentences=MAX_SENTENCES):
+    """Segment text into sentence Windows whose start/end are character offsets into text"""
+    sentences = []
+    for match in SENTENCE_PATTERN.finditer(text or ''):
+        sentence = match.group().strip()
+        # Skip fragments with no words (stray punctuation, list markers)
+        if not any(c.isalpha() for c in sentence):
+            continue
+        start = match.start() + match.group().index(sentence)
+        sentences.append(Window(sentence, start, start + len(sentence), len(sentence.split())))
+        if max_sentences and len(sentences) == max_sentences:
+            break
+    return sentences
+
+def analyze_sentiment_sentences(text, batch_size=DEFAULT_BATCH_SIZE, context=None, deterministic=False):
+    """Score every sentence of text in one batched classifier call.
+
+    Returns ``{'score', 'label', 'sentences'}`` where each sentence carries its
+    text, character span, label and score on the same -1..1 scale as
+    analyze_sentiment; the document score is the length-weighted aggregate.
+    """
+    contexts = [context] if context is not None else None
+    return analyze_sentiment_sentences_batch([text], batch_size, contexts, deterministic)[0]
+
+def analyze_sentiment_sentences_batch(texts, batch_size=DEFAULT_BATCH_SIZE, contexts=None, deterministic=False):
+    """Batched counterpart of analyze_sentiment_sentences; returns one result per text"""
+    outputs = [{'score': 0.0, 'label': 'Neutral', 'sentences': []} for _ in texts]
+    contexts = make_contexts(texts, contexts)
+    sentence_lists = [split_sentences(text) if text and len(text.strip()) >= 10 else [] for text in texts]
+    valid = [i for i, sentences in enumerate(sentence_lists) if sentences]
+    if not valid:
+        return outputs
+
+    try:
+        classifier = get_sentiment_analyzer()
+        results = score_chunks([contexts[i] for i in valid],
+                               [[s.text for s in sentence_lists[i]] for i in valid],
+                               classifier, batch_size)
+        for i, doc_results in zip(valid, results):
+            sentences = sentence_lists[i]
+            score, label = _map_sentiment(texts[i], aggregate_window_sentiment(sentences, doc_results), deterministic)
+            outputs[i] = {
+                'score': score,
+                'label': label,
+                'sentences': [_sentence_entry(sentence, result) for sentence, result in zip(sentences, doc_results)],
+            }
+    except Exception as e:
+        print(f"Error in sentence sentiment analysis: {e}")
+
+    return outputs
+
+def _sentence_entry(sentence, result):
+    # No emotional-word nudge per sentence: the heatmap shows the model's view
+    score, label = _map_sentiment(sentence.text, result, deterministic=True, emotional=(set(), set()))
+    return {'text': sentence.text, 'start': sentence.start, 'end': sentence.end, 'score': score, 'label': label}
+
+def aggregate_window_sentiment(windows, results):
+    """Combine per-window classifier output into one length-weighted result"""
+    total_weight = 0
+    positive = 0.0
+    for window, result in zip(windows, results):
+        weight = max(1, window.n_tokens)
+        positive += weight * positive_probability(result)
+        total_weight += weight
+    if not total_weight:
+        return {'label': 'NEUTRAL', 'score': 0.0}
+    return sentiment_from_positive(positive / total_weight)
+
+def positive_probability(result):
+    """Probability of POSITIVE implied by one binary classifier output"""
+    score = float(result['score'])
+    return score if result['label'] == 'POSITIVE' else 1.0 - score
+
+def sentiment_from_positive(positive):
+    """Classifier-style result for an aggregated POSITIVE probability"""
+    if positive >= 0.5:
+        return {'label': 'POSITIVE', 'score': positive}
+    return {'label': 'NEGATIVE', 'score': 1.0 - positive}
+
+def emotional_words(text):
+    """Positive and negative emotional words present in text"""
+    text_lower = text.lower()
+    return ({word for word in POSITIVE_WORDS if word in text_lower},
+            {word for word in NEGATIVE_WORDS if word in text_lower})
+
+def _map_sentiment(text, result, deterministic=False, emotional=None):
+    """Turn raw classifier output into a (score, label) pair.
+
+    ``emotional`` may carry a precomputed emotional_words() result, so
+    callers that never hold the whole text (streaming) can still use it.
+    """
+    label = result['label']
+    score = float(result['score'])
+
+    # Map sentiment scores to more realistic ranges
+    if label == 'POSITIVE':
+        # Positive sentiment: 0.1 to 0.9
+        sentiment_score = 0.1 + (score * 0.8)
+        sentiment_label = 'Positive'
+    elif label == 'NEGATIVE':
+        # Negative sentiment: -0.9 to -0.1
+        sentiment_score = -0.9 + (score * 0.8)
+        sentiment_label = 'Negative'
+    else:
+        # Neutral sentiment: -0.1 to 0.1
+        sentiment_score = 0.0 if deterministic else random.uniform(-0.1, 0.1)
+        sentiment_label = 'Neutral'
+
+    # Add some variation based on text content: emotional words that might affect sentiment
+    positive, negative = emotional if emotional is not None else emotional_words(text)
+    pos_count = len(positive)
+    neg_count = len(negative)
+
+    if pos_count > neg_count:
+        sentiment_score += 0.1
+    elif neg_count > pos_count:
+        sentiment_score -= 0.1
+
+    # Clamp score to valid range
+    sentiment_score = max(-1.0, min(1.0, sentiment_score))
+
+    return sentiment_score, sentiment_label
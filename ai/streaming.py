@@ -0,0 +1,216 @@
+import codecs
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from analysis_context import AnalysisContext
+from batching import DEFAULT_BATCH_SIZE
+from bias_model import LEXICON_MATCHER, get_bias_analyzer, scan_lexicon
+from language_flags import find_loaded_terms
+from bias_engine import LABEL_POSITIONS
+from sentiment_model import (emotional_words, get_sentiment_analyzer, positive_probability,
+                             sentiment_from_positive, _map_sentiment)
+
+# Characters of text analyzed per section before a partial result is yielded
+SECTION_CHARS = 4000
+# Loaded-language flags kept for the whole document
+MAX_FLAGS = 5
+
+
+def iter_decoded(stream, chunk_size: int = 65536, encoding: str = 'utf-8') -> Iterator[str]:
+    """Incrementally decode a binary file-like object into text pieces"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def iter_sections(pieces: Iterable[str], section_chars: int = SECTION_CHARS) -> Iterator[str]:
+    """Regroup arbitrary text pieces into sections of about section_chars, cut at whitespace"""
+    buffer = ''
+    for piece in pieces:
+        buffer += piece
+        start = 0
+        while len(buffer) - start >= section_chars:
+            cut = buffer.rfind(' ', start, start + section_chars)
+            if cut <= start:
+                cut = start + section_chars
+            yield buffer[start:cut]
+            start = cut
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer
+
+
+class StreamingAnalysis:
+    """Running analysis state whose size does not depend on document length.
+
+    Keeps the set of lexicon phrases seen, weighted sentiment sums, the
+    fine-tuned model's running class probabilities and at most MAX_FLAGS
+    loaded-language flags. A short tail of each section is carried into the
+    next so that phrases split across sections are still found.
+    """
+
+    def __init__(self, deterministic: bool = False, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.analyzer = get_bias_analyzer()
+        self.deterministic = deterministic
+        self.batch_size = batch_size
+        self.hits = set()
+        self.positive_words = set()
+        self.negative_words = set()
+        self.flags: List[Dict] = []
+        self.sections = 0
+        self.chars = 0
+        self._carry = ''
+        self._carry_length = max(LEXICON_MATCHER.max_phrase_length, 16)
+        self._bias_sum = 0.0
+        self._bias_weight = 0
+        self._positive_sum = 0.0
+        self._positive_weight = 0
+        self._model_probabilities: Dict[str, float] = {}
+        self._model_weight = 0
+
+    def feed(self, section: str) -> None:
+        if not section:
+            return
+        carry = self._carry
+        # Document offset of scanned[0]: the carry is the end of what was already consumed
+        offset = self.chars - len(carry)
+        self.sections += 1
+        self.chars += len(section)
+
+        scanned = carry + section
+        self.hits |= scan_lexicon(scanned)
+        positive, negative = emotional_words(scanned)
+        self.positive_words |= positive
+        self.negative_words |= negative
+        self._carry = self._tail(scanned)
+
+        self._feed_flags(scanned, offset, len(carry))
+        self._feed_sentiment(section)
+        self._feed_model(section)
+
+    def result(self, final: bool = False) -> Dict:
+        analyzer = self.analyzer
+        if self._bias_weight:
+            bias_sentiment = analyzer._label_sentiment_score([self._bias_sum / self._bias_weight], [1])
+        else:
+            bias_sentiment = (0.5, 'Center')
+
+        if self.chars < 10:
+            bias_score, bias_label, details = 0.5, 'Center', {'confidence': 'low', 'reason': 'insufficient_text'}
+        elif analyzer.classifier == 'model' and self._model_weight:
+            bias_score, bias_label, details = analyzer._apply_model(None, self._model_prediction())
+        else:
+            bias_score, bias_label, details = analyzer._combine_indicators(
+                '', bias_sentiment, self.deterministic, self.hits)
+            if self._model_weight:
+                bias_score, bias_label, details = analyzer._apply_model(
+                    (bias_score, bias_label, details), self._model_prediction())
+
+        if self._positive_weight:
+            sentiment_score, sentiment_label = _map_sentiment(
+                '', sentiment_from_positive(self._positive_sum / self._positive_weight), self.deterministic,
+                emotional=(self.positive_words, self.negative_words))
+        else:
+            sentiment_score, sentiment_label = 0.0, 'Neutral'
+
+        return {
+            'bias_score': bias_score,
+            'bias_label': bias_label,
+            'sentiment_score': sentiment_score,
+            'sentiment_label': sentiment_label,
+            'language_flags': list(self.flags),
+            'confidence': details.get('confidence', 'low'),
+            'sections': self.sections,
+            'chars': self.chars,
+            'final': final,
+        }
+
+    def _tail(self, text: str) -> str:
+        tail = text[-self._carry_length:]
+        # Start the carry on a word boundary so it cannot produce partial-word matches
+        space = tail.find(' ')
+        return tail[space + 1:] if space != -1 and len(text) > self._carry_length else tail
+
+    def _feed_flags(self, scanned: str, offset: int, carried: int) -> None:
+        if len(self.flags) >= MAX_FLAGS:
+            return
+        seen = {flag['snippet'] for flag in self.flags}
+        for flag in find_loaded_terms(scanned):
+            # Terms lying wholly in the carry were already seen with the previous section
+            if flag['end'] <= carried or flag['snippet'] in seen:
+                continue
+            self.flags.append(dict(flag, index=flag['index'] + offset, end=flag['end'] + offset))
+            seen.add(flag['snippet'])
+            if len(self.flags) >= MAX_FLAGS:
+                return
+
+    def _feed_sentiment(self, section: str) -> None:
+        try:
+            classifier = get_sentiment_analyzer()
+        except Exception as e:
+            print(f"Error in sentiment analysis: {e}")
+            return
+        context = AnalysisContext(section)
+        windows = [w for w in context.windows(classifier) if len(w.text.strip()) >= 10]
+        if not windows:
+            return
+        results = context.sentiment([w.text for w in windows], classifier, self.batch_size)
+
+        scores, weights = self.analyzer._window_bias_scores(windows, results)
+        self._bias_sum += sum(score * weight for score, weight in zip(scores, weights))
+        self._bias_weight += sum(weights)
+
+        self._positive_sum += sum(positive_probability(result) * weight for result, weight in zip(results, weights))
+        self._positive_weight += sum(weights)
+
+    def _feed_model(self, section: str) -> None:
+        engine = self.analyzer.engine
+        if engine is None or len(section.strip()) < 10:
+            return
+        prediction = engine.predict([section], self.batch_size)[0]
+        weight = len(section)
+        for label, probability in prediction['probabilities'].items():
+            self._model_probabilities[label] = self._model_probabilities.get(label, 0.0) + probability * weight
+        self._model_weight += weight
+
+    def _model_prediction(self) -> Dict:
+        probabilities = {label: total / self._model_weight for label, total in self._model_probabilities.items()}
+        label = max(probabilities, key=probabilities.get)
+        score = sum(LABEL_POSITIONS.get(name, 0.5) * p for name, p in probabilities.items())
+        return {'label': label, 'score': score, 'probabilities': probabilities}
+
+
+def analyze_text_stream(pieces: Iterable[str], section_chars: int = SECTION_CHARS,
+                        stop_when: Optional[Callable[[Dict], bool]] = None,
+                        deterministic: bool = False, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Dict]:
+    """Analyze a document given as an iterator of text pieces.
+
+    Yields a partial analyze_text-style result after every section, each
+    with ``final`` set on the last one. If ``stop_when(partial)`` returns
+    True the stream stops early and that result is marked final; callers
+    may also simply stop iterating.
+    """
+    state = StreamingAnalysis(deterministic=deterministic, batch_size=batch_size)
+    sections = iter_sections(pieces, section_chars)
+    current = next(sections, None)
+    if current is None:
+        yield state.result(final=True)
+        return
+
+    while current is not None:
+        state.feed(current)
+        upcoming = next(sections, None)
+        partial = state.result(final=upcoming is None)
+        if not partial['final'] and stop_when is not None and stop_when(partial):
+            partial['final'] = True
+            partial['stopped_early'] = True
+            yield partial
+            return
+        yield partial
+        current = upcoming
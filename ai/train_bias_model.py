@@ -267,7 +267,8 @@ def main():
     print("\n🎯 Next steps:")
     print("1. Add more training examples to custom_training_data.json")
     print("2. Run this script again to retrain the model")
-    print("3. Update bias_model.py to use the trained model")
+    print("3. Set BIAS_CLASSIFIER=model (or blend) to serve the trained model")
+    print("4. Compare it with the rule-based path: python benchmark_bias_engine.py")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,186 +1,403 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
+import json
 import time
-import requests
-from bs4 import BeautifulSoup
 import sys
+import uuid
+from redis.exceptions import RedisError
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../ai')))
-from analyze_text import analyze_text
+from analyze_text import SENTENCE_SENTIMENT, analyze_text_stream, loaded_models
+from streaming import iter_decoded
+from jobs import on_analysis_failure, result_cache, run_analysis_batch_job, run_analysis_job, store
+# Analysis, Article and db are re-exported for tests/test_backend.py
+from models import Analysis, Article, db, init_db
+from store import HISTORY_ANALYSIS_FIELDS, HISTORY_ARTICLE_FIELDS, HISTORY_DEFAULT_FIELDS, RESULT_FIELDS, STORE_BACKEND
+from queues import BATCH_JOB_SIZE, QUEUE_MODE, choose_lane, enqueue, redis_conn
+from dedup import DEDUP_IN_FLIGHT_MAX_AGE, DEDUP_MAX_AGE, DEDUP_SCOPE, intake_key, single_flight
+from result_cache import content_hash
+from urls import canonical_url
+import events
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Before'])
+# Articles and analyses live in the database (SQLite locally, Postgres via DATABASE_URL),
+# or with STORE_BACKEND=memory in this process only
+if STORE_BACKEND == 'sql':
+    init_db(app)
 
-# In-memory storage for testing
-articles_db = {}
-analysis_db = {}
-job_counter = 0
+# /api/history page sizes
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
 
-def fetch_article_text(url):
-    """Fetch and extract article text from URL"""
+# /api/analyze/batch limits and how often its stream checks for finished records
+BATCH_MAX_RECORDS = int(os.environ.get('BATCH_MAX_RECORDS', 10000))
+BATCH_POLL_SECONDS = 0.5
+BATCH_STREAM_TIMEOUT = int(os.environ.get('BATCH_STREAM_TIMEOUT', 3600))
+# /api/jobs/<id>/events: keep-alive interval (also when dead jobs are detected) and stream lifetime
+SSE_HEARTBEAT_SECONDS = 15
+SSE_TIMEOUT = int(os.environ.get('SSE_TIMEOUT', 900))
+
+FALLBACK_RESULTS = {
+    'bias_score': 0.5,
+    'bias_label': 'Center',
+    'sentiment_score': 0.0,
+    'sentiment_label': 'Neutral',
+    'language_flags': [],
+    'sentences': [],
+}
+
+def run_inline(analysis_id):
+    """Run an analysis in this process (inline mode, tests, or when Redis is down)"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Extract text from common article containers
-        article_selectors = [
-            'article', '[class*="article"]', '[class*="content"]', 
-            '[class*="post"]', '[class*="story"]', 'main', '.entry-content'
-        ]
-        
-        text = ""
-        for selector in article_selectors:
-            elements = soup.select(selector)
-            if elements:
-                text = ' '.join([elem.get_text().strip() for elem in elements])
-                break
-        
-        # Fallback to body text if no article content found
-        if not text:
-            text = soup.get_text()
-        
-        # Clean up text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return text[:5000]  # Limit text length
+        run_analysis_job(analysis_id)
     except Exception as e:
-        print(f"Error fetching article from {url}: {e}")
-        return ""
+        print(f"Error in analysis: {e}")
+        # Fallback results
+        store.save_results(analysis_id, FALLBACK_RESULTS)
+        events.publish(analysis_id, 'complete')
 
-def run_analysis_job(analysis_id):
-    """Run analysis job (simplified for testing)"""
-    global analysis_db
-    analysis = analysis_db.get(analysis_id)
-    if not analysis:
-        return
-    
-    article_id = analysis['article_id']
-    article = articles_db.get(article_id)
-    if not article:
+def run_batch_inline(analysis_ids):
+    """Inline counterpart of run_analysis_batch_job, with the same fallback as run_inline"""
+    try:
+        run_analysis_batch_job(analysis_ids)
+    except Exception as e:
+        print(f"Error in batch analysis: {e}")
+        store.save_many([(analysis_id, FALLBACK_RESULTS, None) for analysis_id in analysis_ids])
+        for analysis_id in analysis_ids:
+            events.publish(analysis_id, 'complete')
+
+def jobs_inline():
+    """Whether jobs run in this process: in tests, in inline queue mode, and with the memory store (workers can't see it)"""
+    return bool(app.config.get('TESTING')) or QUEUE_MODE == 'inline' or STORE_BACKEND == 'memory'
+
+def submit_batch_jobs(groups, lane):
+    """Queue one job per group of analysis ids; returns the groups that must run inline instead"""
+    if jobs_inline():
+        return groups
+    for index, group in enumerate(groups):
+        try:
+            job = enqueue(run_analysis_batch_job, group, lane=lane, on_failure=on_analysis_failure)
+        except RedisError as e:
+            print(f"Warning: Could not enqueue batch job, running inline: {e}")
+            return groups[index:]
+        store.update_analyses(group, job_id=job.id)
+    return []
+
+def submit_analysis_job(analysis_id, lane):
+    """Hand the analysis to the RQ queue, or run it inline if queuing is off or Redis is down"""
+    if jobs_inline():
+        run_inline(analysis_id)
         return
+    try:
+        job = enqueue(run_analysis_job, analysis_id, lane=lane, on_failure=on_analysis_failure)
+        store.update_analysis(analysis_id, job_id=job.id)
+    except RedisError as e:
+        print(f"Warning: Could not enqueue analysis job, running inline: {e}")
+        run_inline(analysis_id)
+
+def refresh_status(analysis):
+    """Status of an analysis, marking it failed if its job died without reporting back.
     
-    text = article['raw_text']
-    if not text and article['url']:
-        text = fetch_article_text(article['url'])
-        if text:
-            article['raw_text'] = text
-    
+    Workers record progress in the database themselves; RQ is only asked
+    about jobs that still look queued or started, to catch killed work
+    horses and expired jobs.
+    """
+    if analysis['status'] not in ('queued', 'started') or not analysis['job_id']:
+        return analysis['status']
     try:
-        results = analyze_text(text or '')
-        analysis['bias_score'] = results['bias_score']
-        analysis['bias_label'] = results['bias_label']
-        analysis['sentiment_score'] = results['sentiment_score']
-        analysis['sentiment_label'] = results['sentiment_label']
-        analysis['language_flags'] = results['language_flags']
-        analysis['completed_at'] = time.time()
-    except Exception as e:
-        print(f"Error in analysis: {e}")
-        # Fallback results
-        analysis['bias_score'] = 0.5
-        analysis['bias_label'] = 'Center'
-        analysis['sentiment_score'] = 0.0
-        analysis['sentiment_label'] = 'Neutral'
-        analysis['language_flags'] = []
-        analysis['completed_at'] = time.time()
+        state = Job.fetch(analysis['job_id'], connection=redis_conn).get_status()
+    except NoSuchJobError:
+        state, error = JobStatus.FAILED, 'Job expired before it finished'
+    except RedisError as e:
+        print(f"Warning: Could not read job status: {e}")
+        return analysis['status']
+    else:
+        error = analysis['error'] or 'Analysis failed'
+    
+    if state in (JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED):
+        # Re-read first: the worker may have saved results since the row was loaded
+        current = store.get_analysis(analysis['id'])
+        if current['status'] in ('queued', 'started'):
+            store.update_analysis(analysis['id'], status='failed', error=error)
+            current.update(status='failed', error=error)
+            events.publish(analysis['id'], 'failed', error=error)
+        analysis.update(current)
+    return analysis['status']
 
 @app.route('/api/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'healthy'})
+    payload = {'status': 'healthy', 'models': loaded_models(), 'cache': result_cache.stats()}
+    if STORE_BACKEND == 'memory':
+        payload['store'] = store.stats()
+    return jsonify(payload)
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
-    global job_counter, articles_db, analysis_db
-    
     user_id = request.form.get('userId', 'demo-user')
     url = request.form.get('url')
     file = request.files.get('file')
     raw_text = request.form.get('raw_text')
+    # Frontend submissions use the interactive lane; scripts may ask for bulk or reanalysis
+    lane = choose_lane(request.form.get('lane'))
+    # Per-sentence scores (the results heatmap) cost a forward pass per sentence, so they are opt-in
+    sentences = request.form.get('sentences') in ('1', 'true')
     
     if file:
         raw_text = file.read().decode('utf-8', errors='ignore')
     
-    # Create article
-    article_id = len(articles_db) + 1
-    articles_db[article_id] = {
-        'id': article_id,
-        'user_id': user_id,
-        'url': url,
-        'raw_text': raw_text,
-        'submitted_at': time.time()
-    }
-    
-    # Create analysis
-    job_counter += 1
-    analysis_db[job_counter] = {
-        'id': job_counter,
-        'article_id': article_id,
-        'bias_score': None,
-        'bias_label': None,
-        'sentiment_score': None,
-        'sentiment_label': None,
-        'language_flags': None,
-        'completed_at': None
-    }
-    
-    # Run analysis immediately for testing
-    run_analysis_job(job_counter)
-    
-    return jsonify({'jobId': job_counter})
+    analysis_id, reused = submit_deduplicated(user_id, url, raw_text, lane, sentences)
+    if not reused:
+        # Returns as soon as the job is queued; clients poll /api/status
+        submit_analysis_job(analysis_id, lane)
+    
+    return jsonify({'jobId': analysis_id, 'reused': reused})
+
+def submit_deduplicated(user_id, url, raw_text, lane, sentences=False):
+    """Store a submission unless the same page or text is already analyzed or in flight.
+    
+    Returns (analysis_id, reused). Duplicates are matched on canonical URL
+    (tracking params and fragments stripped) or on the hash of the text.
+    Concurrent duplicates are coalesced onto one analysis; the reanalysis
+    lane always creates a new one, and so does a request for sentence
+    scores that the duplicate lacks. An in-flight duplicate is only reused
+    while its job is alive and younger than DEDUP_IN_FLIGHT_MAX_AGE.
+    """
+    item = {'url': url, 'raw_text': raw_text, 'sentences': sentences}
+    canonical = canonical_url(url) if url and not raw_text else None
+    text_hash = content_hash(raw_text) if raw_text else None
+    if lane == 'reanalysis' or DEDUP_MAX_AGE <= 0 or not (canonical or text_hash):
+        return store.submit(user_id, [item], lane)[0], False
+    
+    with single_flight.hold(intake_key(canonical, text_hash), use_redis=not jobs_inline()):
+        duplicate = store.find_duplicate(canonical, text_hash, max_age=DEDUP_MAX_AGE,
+                                         user_id=user_id if DEDUP_SCOPE == 'user' else None)
+        if duplicate and reusable(duplicate, sentences):
+            return duplicate['id'], True
+        return store.submit(user_id, [item], lane)[0], False
+
+def reusable(duplicate, sentences=False):
+    """Whether a duplicate found at intake can stand in for a new analysis"""
+    if duplicate['status'] in ('queued', 'started'):
+        # A job lost before it ran (Redis flushed, enqueue failed) would otherwise hold every later copy
+        if time.time() - duplicate['created_at'] > DEDUP_IN_FLIGHT_MAX_AGE or refresh_status(duplicate) == 'failed':
+            return False
+    return not sentences or has_sentence_scores(duplicate)
+
+def has_sentence_scores(analysis):
+    """Whether an analysis has (or, still in flight, will have) per-sentence scores"""
+    if analysis['status'] == 'complete':
+        return analysis['sentences'] is not None
+    return bool(analysis['score_sentences']) or SENTENCE_SENTIMENT
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyze a JSONL body of {"id", "url" | "raw_text"} records, streaming NDJSON results.
+    
+    Records are stored in one bulk insert and queued in groups of
+    BATCH_JOB_SIZE, so the models see real batches. The first line of the
+    response carries a batchId; GET /api/batches/<batchId> resumes the
+    stream if the connection drops.
+    """
+    user_id = request.args.get('userId', 'demo-user')
+    items = []
+    for number, line in enumerate(request.stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return jsonify({'error': f'line {number}: invalid JSON'}), 400
+        if not isinstance(record, dict) or not (record.get('url') or record.get('raw_text')):
+            return jsonify({'error': f'line {number}: record needs a url or raw_text'}), 400
+        if len(items) == BATCH_MAX_RECORDS:
+            return jsonify({'error': f'at most {BATCH_MAX_RECORDS} records per batch'}), 413
+        ref = record.get('id')
+        items.append({'url': record.get('url'), 'raw_text': record.get('raw_text'),
+                      'ref': None if ref is None else str(ref)})
+    if not items:
+        return jsonify({'error': 'no records'}), 400
+    
+    lane = choose_lane(request.args.get('lane'), batch_size=len(items))
+    batch_id = uuid.uuid4().hex
+    analysis_ids = store.submit(user_id, items, lane, batch_id)
+    groups = [analysis_ids[i:i + BATCH_JOB_SIZE] for i in range(0, len(analysis_ids), BATCH_JOB_SIZE)]
+    inline_groups = submit_batch_jobs(groups, lane)
+    
+    return Response(stream_with_context(batch_events(batch_id, analysis_ids, inline_groups)),
+                    mimetype='application/x-ndjson')
+
+@app.route('/api/batches/<batch_id>', methods=['GET'])
+def batch_progress(batch_id):
+    """Stream a batch's results again: finished records first, then the rest as they complete"""
+    analysis_ids = store.batch_ids(batch_id)
+    if not analysis_ids:
+        return jsonify({'error': 'not found'}), 404
+    return Response(stream_with_context(batch_events(batch_id, analysis_ids)), mimetype='application/x-ndjson')
+
+def batch_events(batch_id, analysis_ids, inline_groups=()):
+    """NDJSON lines: a header, one line per record as it finishes, then a summary"""
+    yield json.dumps({'batchId': batch_id, 'total': len(analysis_ids)}) + '\n'
+    pending = list(analysis_ids)
+    inline_groups = list(inline_groups)
+    counts = {'complete': 0, 'failed': 0}
+    deadline = time.monotonic() + BATCH_STREAM_TIMEOUT
+    while pending:
+        finished = store.finished(pending)
+        for analysis in finished:
+            counts[analysis['status']] += 1
+            yield json.dumps(batch_line(analysis)) + '\n'
+        if finished:
+            done = {analysis['id'] for analysis in finished}
+            pending = [i for i in pending if i not in done]
+        if not pending or time.monotonic() > deadline:
+            break
+        if inline_groups:
+            run_batch_inline(inline_groups.pop(0))
+        elif not finished:
+            time.sleep(BATCH_POLL_SECONDS)
+    yield json.dumps({'batchId': batch_id, 'done': not pending, 'pending': len(pending), **counts}) + '\n'
+
+def batch_line(analysis):
+    line = {'id': analysis['client_ref'], 'jobId': analysis['id'], 'status': analysis['status']}
+    if analysis['status'] == 'failed':
+        line['error'] = analysis['error']
+    else:
+        line.update(result_fields(analysis))
+    return line
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """Analyze an upload section by section, streaming partial results as NDJSON.
+    
+    Memory stays flat in document size. With stopWhenConfident=1 the stream
+    ends once the bias estimate has high confidence.
+    """
+    file = request.files.get('file')
+    if file:
+        pieces = iter_decoded(file.stream)
+    else:
+        pieces = [request.form.get('raw_text') or '']
+    
+    stop_when = None
+    if request.form.get('stopWhenConfident') in ('1', 'true'):
+        stop_when = lambda partial: partial['confidence'] == 'high' and partial['sections'] >= 2
+    
+    def generate():
+        for partial in analyze_text_stream(pieces, stop_when=stop_when, deterministic=True):
+            yield json.dumps(partial) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @app.route('/api/status/<int:job_id>', methods=['GET'])
 def status(job_id):
-    analysis = analysis_db.get(job_id)
+    analysis = store.get_analysis(job_id)
     if not analysis:
         return jsonify({'status': 'not_found'}), 404
-    return jsonify({'status': 'complete' if analysis['completed_at'] else 'pending'})
+    status = refresh_status(analysis)
+    if status == 'failed':
+        return jsonify({'status': status, 'error': analysis['error']})
+    return jsonify({'status': status})
 
 @app.route('/api/results/<int:job_id>', methods=['GET'])
 def results(job_id):
-    analysis = analysis_db.get(job_id)
+    analysis = store.get_analysis(job_id)
     if not analysis:
         return jsonify({'error': 'not found'}), 404
     
-    return jsonify({
-        'bias_score': analysis['bias_score'] or 0.5,
-        'bias_label': analysis['bias_label'] or 'Center',
-        'sentiment_score': analysis['sentiment_score'] or 0.0,
-        'sentiment_label': analysis['sentiment_label'] or 'Neutral',
-        'language_flags': analysis['language_flags'] or [],
-    })
+    refresh_status(analysis)
+    return jsonify(results_payload(analysis))
+
+def result_fields(analysis):
+    """An analysis's results, with FALLBACK_RESULTS for fields it lacks, so every endpoint returns one shape"""
+    return {field: FALLBACK_RESULTS[field] if analysis[field] is None else analysis[field] for field in RESULT_FIELDS}
+
+def results_payload(analysis):
+    return {'status': analysis['status'], **result_fields(analysis)}
+
+@app.route('/api/jobs/<int:job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events for one analysis: stage transitions, then the result.
+    
+    Each event's data is JSON with a ``stage`` (queued, fetching, analyzing,
+    complete or failed). The complete event also carries ``result``, the
+    /api/results payload, and the stream ends after complete or failed.
+    """
+    if not store.get_analysis(job_id):
+        return jsonify({'error': 'not found'}), 404
+    
+    def sse(message):
+        return f"data: {json.dumps(message)}\n\n"
+    
+    def final_event(analysis):
+        if analysis['status'] == 'complete':
+            return sse({'jobId': job_id, 'stage': 'complete', 'result': results_payload(analysis)})
+        return sse({'jobId': job_id, 'stage': 'failed', 'error': analysis['error']})
+    
+    def generate():
+        # Subscribe before reading the row so a transition in between is not missed
+        with events.Subscription(job_id) as subscription:
+            analysis = store.get_analysis(job_id)
+            if analysis['status'] in events.FINAL_STAGES:
+                yield final_event(analysis)
+                return
+            stage = 'analyzing' if analysis['status'] == 'started' else analysis['status']
+            yield sse({'jobId': job_id, 'stage': stage})
+            
+            deadline = time.monotonic() + SSE_TIMEOUT
+            while time.monotonic() < deadline:
+                message = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if message is None:
+                    # Quiet for a while: make sure the job is still alive, and keep proxies from closing us
+                    analysis = store.get_analysis(job_id)
+                    if refresh_status(analysis) in events.FINAL_STAGES:
+                        yield final_event(analysis)
+                        return
+                    yield ': keep-alive\n\n'
+                elif message['stage'] in events.FINAL_STAGES:
+                    yield final_event(store.get_analysis(job_id))
+                    return
+                else:
+                    yield sse(message)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/history', methods=['GET'])
 def history():
+    """A page of the user's past analyses, newest first.
+    
+    ?limit= sets the page size (default HISTORY_PAGE_SIZE, at most
+    HISTORY_MAX_PAGE_SIZE), ?before=<id> continues after the last item of the
+    previous page and ?fields= selects a comma-separated subset of fields
+    (400 for unknown ones). The cursor for the next page is returned in the
+    X-Next-Before header.
+    """
     user_id = request.args.get('userId', 'demo-user')
-    history = []
-    
-    for article_id, article in articles_db.items():
-        if article['user_id'] == user_id:
-            analysis = None
-            for analysis_id, analysis_data in analysis_db.items():
-                if analysis_data['article_id'] == article_id:
-                    analysis = analysis_data
-                    break
-            
-            history.append({
-                'id': article_id,
-                'url': article['url'],
-                'bias_label': analysis['bias_label'] if analysis else None,
-                'sentiment_label': analysis['sentiment_label'] if analysis else None,
-                'submitted_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(article['submitted_at'])),
-            })
-    
-    return jsonify(history)
+    limit = max(1, min(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), HISTORY_MAX_PAGE_SIZE))
+    before = request.args.get('before', type=int)
+    fields = HISTORY_DEFAULT_FIELDS
+    if request.args.get('fields'):
+        allowed = HISTORY_ARTICLE_FIELDS + HISTORY_ANALYSIS_FIELDS
+        fields = [f for f in request.args['fields'].split(',') if f]
+        unknown = [f for f in fields if f not in allowed]
+        if unknown or not fields:
+            return jsonify({'error': f"unknown fields: {', '.join(unknown)}" if unknown else 'no fields',
+                            'allowed': allowed}), 400
+    
+    page, next_before = store.history(user_id, limit, before, fields)
+    for item in page:
+        if 'submitted_at' in item:
+            item['submitted_at'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(item['submitted_at']))
+    
+    response = jsonify(page)
+    if next_before is not None:
+        response.headers['X-Next-Before'] = str(next_before)
+    return response
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001) 
\ No newline at end of file
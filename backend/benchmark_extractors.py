@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Speed comparison of the HTML extractors on the saved pages in fixtures/html,
+with a check that they extract the same text. Pages are read once up front
+and every extractor parses the same bytes. lxml is also timed without a
+character budget, which isolates what its early truncation saves.
+
+Usage:
+    python benchmark_extractors.py --repeats 50
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from extractors import EXTRACTORS, MAX_TEXT_CHARS
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'html')
+
+
+def _time(fn, repeats):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return (time.perf_counter() - start) / repeats, result
+
+
+def _agreement(text, reference):
+    """Share of the reference's words found, in order, at the start of text"""
+    words, expected = text.split(), reference.split()
+    same = 0
+    for a, b in zip(words, expected):
+        if a != b:
+            break
+        same += 1
+    return same / len(expected) if expected else 1.0
+
+
+def load_pages(paths):
+    pages = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def run_benchmark(paths, repeats=50, max_chars=MAX_TEXT_CHARS):
+    pages = load_pages(paths)
+    report = {'pages': len(pages), 'repeats': repeats, 'max_chars': max_chars, 'extractors': []}
+    reference = {name: EXTRACTORS['bs4'](html, max_chars) for name, html in pages.items()}
+
+    runs = [(name, extract, max_chars) for name, extract in EXTRACTORS.items()]
+    if 'lxml' in EXTRACTORS:
+        runs.append(('lxml-full', EXTRACTORS['lxml'], sys.maxsize))
+    for extractor_name, extract, budget in runs:
+        row = {'extractor': extractor_name, 'max_chars': None if budget == sys.maxsize else budget, 'pages': []}
+        total = 0.0
+        for name, html in pages.items():
+            seconds, text = _time(lambda: extract(html, budget), repeats)
+            total += seconds
+            row['pages'].append({
+                'page': name,
+                'kb': len(html) / 1024,
+                'ms': seconds * 1000,
+                'chars': len(text),
+                'agreement': _agreement(text, reference[name]),
+            })
+        row['ms_per_page'] = total / len(pages) * 1000
+        report['extractors'].append(row)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the bs4 and lxml article extractors')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='Directory of saved .html pages')
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--max-chars', type=int, default=MAX_TEXT_CHARS)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, '*.html')))
+    if not paths:
+        parser.error(f'no .html files in {args.fixtures}')
+    report = run_benchmark(paths, args.repeats, args.max_chars)
+
+    print("⏱️  HTML Extractor Benchmark")
+    print("=" * 70)
+    print(f"{'Extractor':<10}{'Page':<24}{'KB':>8}{'ms':>10}{'chars':>8}{'agree':>8}")
+    for row in report['extractors']:
+        for page in row['pages']:
+            print(f"{row['extractor']:<10}{page['page']:<24}{page['kb']:>8.1f}{page['ms']:>10.2f}"
+                  f"{page['chars']:>8}{page['agreement']:>8.2f}")
+    print("-" * 70)
+    for row in report['extractors']:
+        print(f"{row['extractor']:<10}{'mean per page':<24}{'':>8}{row['ms_per_page']:>10.2f}")
+
+    with open('extractor_benchmark.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Detailed results saved to: extractor_benchmark.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from redis.exceptions import RedisError
+from queues import redis_conn
+
+# Submissions of a page or text analyzed (or queued) within this many seconds reuse that analysis; 0 turns it off
+DEDUP_MAX_AGE = float(os.environ.get('DEDUP_MAX_AGE', 24 * 3600))
+# user: only reuse the submitting user's own analyses (keeps /api/history complete); global: anyone's
+DEDUP_SCOPE = os.environ.get('DEDUP_SCOPE', 'user')
+# Queued or running analyses older than this are not reused: their job may have been lost
+DEDUP_IN_FLIGHT_MAX_AGE = float(os.environ.get('DEDUP_IN_FLIGHT_MAX_AGE', 3600))
+CLAIM_PREFIX = 'biased:intake:'
+# Upper bound on holding a claim (a lookup and an insert), so a crashed holder cannot block intake
+CLAIM_TTL = 10
+CLAIM_POLL_SECONDS = 0.02
+# Delete a claim only if it still holds our token; one script, so the check and the delete are atomic
+RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+def intake_key(canonical=None, text_hash=None):
+    """Identity of a submission: its canonical URL, else the hash of its text"""
+    if canonical:
+        return 'url:' + canonical
+    return 'text:' + text_hash
+
+
+class SingleFlight:
+    """Per-key mutual exclusion around "look for a duplicate, else insert".
+
+    Concurrent duplicate submissions then coalesce: the first inserts the
+    analysis, the others find it in flight once they get the key. Threads
+    of one process share striped locks; processes take a short Redis
+    SET NX claim. Without Redis only the in-process lock applies.
+    """
+
+    def __init__(self, stripes=64, ttl=CLAIM_TTL):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self.ttl = ttl
+
+    @contextmanager
+    def hold(self, key, use_redis=True):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        with self._locks[int(digest[:8], 16) % len(self._locks)]:
+            claim = self._claim(CLAIM_PREFIX + digest) if use_redis else None
+            try:
+                yield
+            finally:
+                if claim:
+                    self._release(*claim)
+
+    def _claim(self, name):
+        """Wait for the Redis claim on name; returns (name, token), or None to go ahead unclaimed"""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.ttl
+        try:
+            while not redis_conn.set(name, token, nx=True, ex=self.ttl):
+                if time.monotonic() > deadline:
+                    print(f"Warning: Intake claim {name} not released, continuing without it")
+                    return None
+                time.sleep(CLAIM_POLL_SECONDS)
+        except RedisError as e:
+            print(f"Warning: Could not claim intake key, deduplicating in this process only: {e}")
+            return None
+        return name, token
+
+    def _release(self, name, token):
+        try:
+            # Only delete our own claim; it may have expired and been taken by another process
+            redis_conn.eval(RELEASE_SCRIPT, 1, name, token)
+        except RedisError:
+            pass
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,112 @@
+import json
+import queue
+import threading
+import time
+from redis.exceptions import RedisError
+from queues import redis_conn
+
+# Stages an analysis goes through, in order; complete and failed are final
+STAGES = ['queued', 'fetching', 'analyzing', 'complete', 'failed']
+FINAL_STAGES = ('complete', 'failed')
+CHANNEL_PREFIX = 'biased:job:'
+
+
+def channel(analysis_id):
+    return f'{CHANNEL_PREFIX}{analysis_id}'
+
+
+class LocalBroker:
+    """In-process pub/sub for jobs that run inside the API (inline mode or no Redis)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, analysis_id):
+        inbox = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(analysis_id, []).append(inbox)
+        return inbox
+
+    def unsubscribe(self, analysis_id, inbox):
+        with self._lock:
+            inboxes = self._subscribers.get(analysis_id, [])
+            if inbox in inboxes:
+                inboxes.remove(inbox)
+            if not inboxes:
+                self._subscribers.pop(analysis_id, None)
+
+    def publish(self, analysis_id, message):
+        with self._lock:
+            inboxes = list(self._subscribers.get(analysis_id, []))
+        for inbox in inboxes:
+            inbox.put(message)
+
+
+local_broker = LocalBroker()
+
+
+def publish(analysis_id, stage, **fields):
+    """Announce a stage transition to every subscriber of the analysis, in any process"""
+    message = {'jobId': analysis_id, 'stage': stage, **fields}
+    local_broker.publish(analysis_id, message)
+    try:
+        redis_conn.publish(channel(analysis_id), json.dumps(message))
+    except RedisError:
+        # Only in-process subscribers can be reached; status stays readable from the database
+        pass
+
+
+class Subscription:
+    """Messages for one analysis, from Redis pub/sub if reachable, else from the local broker"""
+
+    def __init__(self, analysis_id):
+        self.analysis_id = analysis_id
+        self._pubsub = None
+        self._inbox = None
+        try:
+            self._pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(channel(analysis_id))
+        except RedisError:
+            self._pubsub = None
+            self._inbox = local_broker.subscribe(analysis_id)
+
+    def get(self, timeout):
+        """Next message, or None if nothing arrived within timeout seconds"""
+        if self._pubsub is not None:
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                try:
+                    # Returns None early for the (ignored) subscribe confirmation
+                    message = self._pubsub.get_message(timeout=remaining)
+                except RedisError:
+                    # Redis went away: wait on in-process messages for the rest of the stream
+                    self.close()
+                    self._pubsub = None
+                    self._inbox = local_broker.subscribe(self.analysis_id)
+                    timeout = remaining
+                    break
+                if message:
+                    return json.loads(message['data'])
+        try:
+            return self._inbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            except RedisError:
+                pass
+        if self._inbox is not None:
+            local_broker.unsubscribe(self.analysis_id, self._inbox)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,136 @@
+import os
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    etree = lxml_html = None
+
+# Characters of article text kept
+MAX_TEXT_CHARS = 5000
+# Extractor used by the fetcher: lxml (fast path) or bs4 (the original html.parser extractor)
+HTML_EXTRACTOR = os.environ.get('HTML_EXTRACTOR', 'lxml')
+
+# Article containers, most specific first; the first kind that occurs on a page wins
+ARTICLE_SELECTORS = [
+    'article', '[class*="article"]', '[class*="content"]',
+    '[class*="post"]', '[class*="story"]', 'main', '.entry-content'
+]
+
+
+def bs4_extract(html, max_chars=MAX_TEXT_CHARS):
+    """Extract article text from an HTML page"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    # Extract text from common article containers
+    text = ""
+    for selector in ARTICLE_SELECTORS:
+        elements = soup.select(selector)
+        if elements:
+            text = ' '.join([elem.get_text().strip() for elem in elements])
+            break
+
+    # Fallback to body text if no article content found
+    if not text:
+        text = soup.get_text()
+
+    # Clean up text
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+
+    return text[:max_chars]  # Limit text length
+
+
+if etree is not None:
+    # ARTICLE_SELECTORS as one XPath union, so the page is searched once; matches come in document order
+    CONTAINER_XPATH = etree.XPath(
+        "//article | //*[contains(@class, 'article') or contains(@class, 'content') or contains(@class, 'post')"
+        " or contains(@class, 'story')] | //main"
+    )
+
+
+def _container_rank(element):
+    """Position in ARTICLE_SELECTORS of the first selector the element matches"""
+    if element.tag == 'article':
+        return 0
+    classes = element.get('class') or ''
+    for rank, name in enumerate(('article', 'content', 'post', 'story'), start=1):
+        if name in classes:
+            return rank
+    # main; .entry-content (last) is always matched by [class*="content"] first
+    return 5
+
+
+def lxml_extract(html, max_chars=MAX_TEXT_CHARS):
+    """Extract article text with lxml, stopping once max_chars of text are collected.
+
+    Same container rules as bs4_extract, except that a container nested in
+    another selected one is not read twice. As there, the whole page is
+    read if the containers hold no text.
+    """
+    if isinstance(html, bytes):
+        # libxml2 assumes Latin-1 for pages without a charset declaration; most are UTF-8
+        try:
+            html = html.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+    try:
+        doc = lxml_html.document_fromstring(html)
+    except ValueError:
+        # Unicode string with an XML encoding declaration
+        doc = lxml_html.document_fromstring(html.encode('utf-8'))
+    except etree.ParserError:
+        # Empty or whitespace-only page
+        return ''
+    etree.strip_elements(doc, 'script', 'style', with_tail=False)
+
+    containers = CONTAINER_XPATH(doc)
+    if containers:
+        best = min(_container_rank(element) for element in containers)
+        roots = []
+        for element in containers:
+            if _container_rank(element) == best and not any(root in element.iterancestors() for root in roots):
+                roots.append(element)
+        text = _collect_text(roots, max_chars)
+        if text:
+            return text
+    return _collect_text([doc], max_chars)
+
+
+def _collect_text(roots, max_chars):
+    """Whitespace-normalized text of roots, stopping once max_chars are collected"""
+    chunks = []
+    size = 0
+    for root in roots:
+        for piece in root.itertext():
+            words = piece.split()
+            if not words:
+                continue
+            chunk = ' '.join(words)
+            chunks.append(chunk)
+            size += len(chunk) + 1
+            if size > max_chars:
+                return ' '.join(chunks)[:max_chars]
+    return ' '.join(chunks)
+
+
+EXTRACTORS = {'bs4': bs4_extract, 'lxml': lxml_extract}
+
+
+def get_extractor(name=HTML_EXTRACTOR):
+    """Extractor function by name, falling back to bs4 when lxml is not installed"""
+    if name not in EXTRACTORS:
+        print(f"Warning: Unknown HTML_EXTRACTOR '{name}', using bs4")
+        return bs4_extract
+    if name == 'lxml' and etree is None:
+        print("Warning: lxml not installed, using the bs4 extractor")
+        return bs4_extract
+    return EXTRACTORS[name]
+
+
+extract_text = get_extractor()
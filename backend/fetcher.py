@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from extractors import extract_text
+from urls import canonical_url, url_host
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+# (connect, read) timeouts in seconds
+FETCH_TIMEOUT = (3.05, float(os.environ.get('FETCH_READ_TIMEOUT', 10)))
+# Kept connections per host, and requests allowed in flight to one host at a time
+FETCH_POOL_SIZE = int(os.environ.get('FETCH_POOL_SIZE', 10))
+FETCH_HOST_CONCURRENCY = int(os.environ.get('FETCH_HOST_CONCURRENCY', 4))
+# Threads used by fetch_many
+FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', 8))
+# Extracted text is cached on disk by canonical URL; within FETCH_CACHE_TTL seconds it is
+# served as is, after that it is revalidated with If-None-Match / If-Modified-Since
+FETCH_CACHE_DIR = os.environ.get('FETCH_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.fetch_cache'))
+FETCH_CACHE_TTL = float(os.environ.get('FETCH_CACHE_TTL', 3600))
+
+
+class Fetcher:
+    """Shared HTTP client for article pages.
+
+    One requests.Session with a pooled adapter keeps connections alive per
+    host; a semaphore per host caps concurrent requests to it. Extracted
+    text is cached on disk with the response's validators, so stale entries
+    are revalidated with a conditional GET and a 304 costs no download or
+    extraction. Safe to use from several threads.
+    """
+
+    def __init__(self, cache_dir=FETCH_CACHE_DIR, ttl=FETCH_CACHE_TTL, host_concurrency=FETCH_HOST_CONCURRENCY,
+                 workers=FETCH_WORKERS, timeout=FETCH_TIMEOUT, extract=extract_text):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.host_concurrency = host_concurrency
+        self.workers = workers
+        self.timeout = timeout
+        self.extract = extract
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(
+            pool_connections=FETCH_POOL_SIZE, pool_maxsize=FETCH_POOL_SIZE,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=['GET']),
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        self._stats = {'requests': 0, 'cache_hits': 0, 'revalidated': 0, 'errors': 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def fetch(self, url):
+        """Article text for url ('' if it cannot be fetched)"""
+        try:
+            key = canonical_url(url)
+        except Exception as e:
+            # fetch_many runs a whole batch job; one bad URL must not fail it
+            self._count('errors')
+            print(f"Error fetching article from {url}: {e}")
+            return ""
+        entry = self._read_cache(key)
+        if entry and time.time() - entry['fetched_at'] < self.ttl:
+            self._count('cache_hits')
+            return entry['text']
+
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            with self._host_slot(url_host(key)):
+                self._count('requests')
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry:
+                self._count('revalidated')
+                entry['fetched_at'] = time.time()
+                self._write_cache(key, entry)
+                return entry['text']
+            response.raise_for_status()
+            text = self.extract(response.content)
+        except Exception as e:
+            self._count('errors')
+            print(f"Error fetching article from {url}: {e}")
+            # A stale copy beats nothing
+            return entry['text'] if entry else ""
+
+        self._write_cache(key, {
+            'url': key,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'text': text,
+        })
+        return text
+
+    def fetch_many(self, urls):
+        """fetch() for many URLs concurrently; results are in input order"""
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(urls))) as pool:
+            return list(pool.map(self.fetch, urls))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _host_slot(self, host):
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.host_concurrency)
+        return slot
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _read_cache(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, key, entry):
+        if not self.cache_dir:
+            return
+        path = self._cache_path(key)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            # Atomic, so concurrent workers never read a half-written entry
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Warning: Could not write fetch cache: {e}")
+
+
+fetcher = Fetcher()
@@ -0,0 +1,238 @@
+import os
+import sys
+from flask import Flask, has_app_context
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../ai')))
+import threading
+from analyze_text import SENTENCE_SENTIMENT, analyze_text, analyze_text_batch, analysis_version
+from language_flags import detect_loaded_language
+from sentiment_model import split_sentences
+from result_cache import ResultCache
+from models import init_db
+from fetcher import fetcher
+from near_dup import NEAR_DUP_BOOTSTRAP, NEAR_DUP_REFRESH_OVERLAP, NearDupIndex
+from store import create_store
+import events
+
+store = create_store()
+_job_app = None
+# Signatures of articles analyzed in this process, to reuse results for near-identical copies
+near_dups = NearDupIndex()
+_near_dup_lock = threading.Lock()
+# Latest completed_at loaded into near_dups from the database (None before the first load)
+_near_dup_seen = None
+
+# Results are keyed on normalized text + model/lexicon version; Redis tier is optional
+result_cache = ResultCache(
+    version=analysis_version(),
+    max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('RESULT_CACHE_TTL', 24 * 3600)),
+    redis_url=os.environ.get('RESULT_CACHE_REDIS_URL', os.environ.get('REDIS_URL')),
+)
+
+def fetch_article_text(url):
+    """Fetch and extract article text from URL (through the shared, caching fetcher)"""
+    return fetcher.fetch(url)
+
+def refresh_near_duplicates():
+    """Add analyses completed since the last refresh, by any process, to this process's index.
+    
+    Workers finish out of id order, so loading goes by completion time. The
+    window starts NEAR_DUP_REFRESH_OVERLAP seconds before the newest
+    completion seen; analyses already in the index are skipped.
+    """
+    global _near_dup_seen
+    if near_dups.capacity <= 0:
+        return
+    if not has_app_context():
+        with job_app().app_context():
+            return refresh_near_duplicates()
+    with _near_dup_lock:
+        if _near_dup_seen is None:
+            rows = store.recent_texts(min(NEAR_DUP_BOOTSTRAP, near_dups.capacity))
+        else:
+            rows = store.recent_texts(near_dups.capacity, since=_near_dup_seen - NEAR_DUP_REFRESH_OVERLAP)
+        # Oldest first, so the newest are the last to be evicted
+        for analysis_id, text, _ in reversed(rows):
+            if analysis_id not in near_dups:
+                near_dups.add(analysis_id, near_dups.signature(text))
+        if rows:
+            _near_dup_seen = max(rows[0][2], _near_dup_seen or 0)
+        elif _near_dup_seen is None:
+            _near_dup_seen = 0
+
+def find_near_duplicate(text):
+    """(signature, source analysis) for text; the source is None unless a near-identical article was analyzed.
+    
+    Only consults the index; call refresh_near_duplicates() first to catch up with other processes.
+    """
+    if near_dups.capacity <= 0:
+        return None, None
+    signature = near_dups.signature(text)
+    match = near_dups.query(signature)
+    source = store.get_analysis(match[0]) if match else None
+    if source is None or source['status'] != 'complete':
+        if match:
+            near_dups.discard(match[0])
+        return signature, None
+    return signature, source
+
+def derive_results(source, text):
+    """Results for text from the analysis of a near-identical article.
+    
+    Document scores and labels are reused. Loaded-language flags are found
+    again in text (a cheap lexicon pass) so their offsets are right, and
+    sentence scores, if the source has them, are carried over for the
+    sentences that are unchanged.
+    """
+    results = {
+        'bias_score': source['bias_score'],
+        'bias_label': source['bias_label'],
+        'sentiment_score': source['sentiment_score'],
+        'sentiment_label': source['sentiment_label'],
+        'language_flags': detect_loaded_language(text),
+    }
+    if source.get('sentences') is not None:
+        scored = {sentence['text']: sentence for sentence in source['sentences']}
+        results['sentences'] = [dict(scored[window.text], start=window.start, end=window.end)
+                                for window in split_sentences(text) if window.text in scored]
+    return results
+
+def analyze_texts(texts, sentences=None):
+    """Results for many texts: from the result cache, from near-duplicates, or one analyze_text_batch call.
+    
+    ``sentences`` flags the texts that need per-sentence scores (all of them
+    with SENTENCE_SENTIMENT); cached or reused results without them are not
+    used for those. Returns (results, reused_from, signatures): reused_from
+    maps text positions to the analysis their results came from; signatures
+    are those of the texts that were actually analyzed, for remember().
+    """
+    wanted = [SENTENCE_SENTIMENT or bool(sentences and sentences[i]) for i in range(len(texts))]
+    results = [result_cache.get(text) for text in texts]
+    for i in range(len(texts)):
+        if results[i] is not None and wanted[i] and 'sentences' not in results[i]:
+            results[i] = None
+    if None in results:
+        refresh_near_duplicates()
+    reused_from, signatures = {}, {}
+    missing = []
+    for i, text in enumerate(texts):
+        if results[i] is not None:
+            continue
+        signature, source = find_near_duplicate(text)
+        if source and (not wanted[i] or source['sentences'] is not None):
+            results[i] = derive_results(source, text)
+            reused_from[i] = source['id']
+            result_cache.set(text, results[i])
+        else:
+            signatures[i] = signature
+            missing.append(i)
+    computed = []
+    if len(missing) == 1:
+        computed = [analyze_text(texts[missing[0]], deterministic=True, sentences=wanted[missing[0]])]
+    elif missing:
+        computed = analyze_text_batch([texts[i] for i in missing], batch_size=len(missing), deterministic=True,
+                                      sentences=[wanted[i] for i in missing])
+    for i, result in zip(missing, computed):
+        result_cache.set(texts[i], result)
+        results[i] = result
+    return results, reused_from, signatures
+
+def remember(analysis_id, signature):
+    """Make a saved analysis available for near-duplicate reuse"""
+    near_dups.add(analysis_id, signature)
+
+def analyze_article(raw_text, url=None, on_stage=None, sentences=False):
+    """Fetch the article if needed and analyze it; returns the analyzed text and the results.
+    
+    ``on_stage`` is called with 'fetching' and 'analyzing' as work moves on;
+    ``sentences`` asks for per-sentence scores.
+    Also returns ``reused_from`` (the analysis of a near-duplicate the results
+    were derived from, if any) and the text's MinHash ``signature``.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    text = raw_text
+    if not text and url:
+        on_stage('fetching')
+        text = fetch_article_text(url)
+    text = text or ''
+    on_stage('analyzing')
+    results, reused_from, signatures = analyze_texts([text], [sentences])
+    return {'raw_text': text, 'results': results[0], 'reused_from': reused_from.get(0), 'signature': signatures.get(0)}
+
+def job_app():
+    """Minimal Flask app giving worker processes a database session"""
+    global _job_app
+    if _job_app is None:
+        _job_app = Flask(__name__)
+        init_db(_job_app)
+    return _job_app
+
+def run_analysis_job(analysis_id):
+    """Queue job: analyze a stored submission and write the results to the database.
+    
+    Inline runs reuse the API's app context; workers push their own.
+    Exceptions propagate so RQ can retry the job and finally mark it failed.
+    """
+    if not has_app_context():
+        with job_app().app_context():
+            return run_analysis_job(analysis_id)
+    
+    analysis = store.get_analysis(analysis_id)
+    article = store.get_article(analysis['article_id']) if analysis else None
+    if not article:
+        return None
+    store.update_analysis(analysis_id, status='started')
+    output = analyze_article(article['raw_text'], article['url'],
+                             on_stage=lambda stage: events.publish(analysis_id, stage),
+                             sentences=analysis['score_sentences'])
+    store.save_results(analysis_id, output['results'], raw_text=output['raw_text'], reused_from=output['reused_from'])
+    remember(analysis_id, output['signature'])
+    events.publish(analysis_id, 'complete')
+    return output['results']
+
+def run_analysis_batch_job(analysis_ids):
+    """Queue job: analyze a group of stored submissions with batched model calls.
+    
+    Texts already in the result cache are reused, and so are the results of
+    near-identical articles; the rest go through analyze_text_batch together,
+    and all results are saved in one transaction.
+    """
+    if not has_app_context():
+        with job_app().app_context():
+            return run_analysis_batch_job(analysis_ids)
+    
+    submissions = store.get_submissions(analysis_ids)
+    store.update_analyses([analysis['id'] for analysis, _ in submissions], status='started')
+    
+    # Pages of URL-only submissions are downloaded concurrently
+    to_fetch = [i for i, (_, article) in enumerate(submissions) if not article['raw_text'] and article['url']]
+    for i in to_fetch:
+        events.publish(submissions[i][0]['id'], 'fetching')
+    fetched = dict(zip(to_fetch, fetcher.fetch_many([submissions[i][1]['url'] for i in to_fetch])))
+    
+    texts = []
+    for i, (analysis, article) in enumerate(submissions):
+        events.publish(analysis['id'], 'analyzing')
+        texts.append(article['raw_text'] or fetched.get(i) or '')
+    
+    results, reused_from, signatures = analyze_texts(texts, [analysis['score_sentences'] for analysis, _ in submissions])
+    store.save_many([(analysis['id'], result, text)
+                     for (analysis, _), result, text in zip(submissions, results, texts)],
+                    {submissions[i][0]['id']: source_id for i, source_id in reused_from.items()})
+    for i, signature in signatures.items():
+        remember(submissions[i][0]['id'], signature)
+    for analysis, _ in submissions:
+        events.publish(analysis['id'], 'complete')
+    return len(submissions)
+
+def on_analysis_failure(job, connection, exc_type, exc_value, tb):
+    """RQ failure callback: record the error, and the status the job is left in"""
+    with job_app().app_context():
+        # Runs on every failed attempt; the job goes back to the queue while retries remain
+        status = 'queued' if job.retries_left else 'failed'
+        ids = job.args[0] if isinstance(job.args[0], list) else [job.args[0]]
+        error = f"{exc_type.__name__}: {exc_value}"
+        store.update_analyses(ids, status=status, error=error)
+        for analysis_id in ids:
+            events.publish(analysis_id, status, error=error)
@@ -0,0 +1,468 @@
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from result_cache import content_hash
+from store import HISTORY_ANALYSIS_FIELDS, HISTORY_ARTICLE_FIELDS, HISTORY_DEFAULT_FIELDS, RESULT_FIELDS, item_url_hash
+from urls import url_hash
+
+# Approximate memory the store may hold, in MB; finished analyses beyond it are evicted, least recently used first
+MEMORY_STORE_MAX_MB = float(os.environ.get('MEMORY_STORE_MAX_MB', 64))
+# Finished analyses not read for this many seconds are evicted (0 = no limit)
+MEMORY_STORE_TTL = float(os.environ.get('MEMORY_STORE_TTL', 3600))
+# SQLite file that evicted entries are appended to, so they stay readable; empty drops them
+MEMORY_STORE_SPILL = os.environ.get('MEMORY_STORE_SPILL', '')
+
+FINAL_STATUSES = ('complete', 'failed')
+# Per-entry overhead (dict, keys, small values) added to the size of its text and JSON fields
+ENTRY_OVERHEAD = 600
+
+
+def _entry_size(data):
+    size = ENTRY_OVERHEAD
+    for value in data.values():
+        if isinstance(value, str):
+            size += len(value)
+        elif isinstance(value, (list, dict)):
+            size += len(json.dumps(value))
+    return size
+
+
+class SpillFile:
+    """Append-only SQLite file of evicted articles and analyses.
+
+    Analyses are stored with their article's user, URL hash and content
+    hash, so duplicate lookups do not depend on the article being spilled too.
+    """
+
+    # Columns added to analyses after the first spill files were written
+    LOOKUP_COLUMNS = ('user_id', 'url_hash', 'content_hash')
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS articles (id INTEGER PRIMARY KEY, user_id TEXT, data TEXT);
+            CREATE INDEX IF NOT EXISTS ix_articles_user_id_id ON articles (user_id, id);
+            CREATE TABLE IF NOT EXISTS analyses (id INTEGER PRIMARY KEY, article_id INTEGER, batch_id TEXT, data TEXT,
+                                                 user_id TEXT, url_hash TEXT, content_hash TEXT);
+        ''')
+        existing = {row[1] for row in self._conn.execute('PRAGMA table_info(analyses)')}
+        for column in self.LOOKUP_COLUMNS:
+            if column not in existing:
+                self._conn.execute(f'ALTER TABLE analyses ADD COLUMN {column} TEXT')
+        self._conn.executescript('''
+            CREATE INDEX IF NOT EXISTS ix_analyses_article_id ON analyses (article_id);
+            CREATE INDEX IF NOT EXISTS ix_analyses_batch_id ON analyses (batch_id);
+            CREATE INDEX IF NOT EXISTS ix_analyses_url_hash ON analyses (url_hash);
+            CREATE INDEX IF NOT EXISTS ix_analyses_content_hash ON analyses (content_hash);
+        ''')
+
+    def add_analysis(self, analysis, article=None):
+        article = article or {}
+        self._conn.execute('INSERT OR REPLACE INTO analyses (id, article_id, batch_id, data, user_id, url_hash, '
+                           'content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           (analysis['id'], analysis['article_id'], analysis['batch_id'], json.dumps(analysis),
+                            article.get('user_id'), article.get('url_hash'), article.get('content_hash')))
+
+    def add_article(self, article):
+        self._conn.execute('INSERT OR REPLACE INTO articles VALUES (?, ?, ?)',
+                           (article['id'], article['user_id'], json.dumps(article)))
+
+    def _load(self, sql, args):
+        return [json.loads(row[0]) for row in self._conn.execute(sql, args)]
+
+    def analyses(self, ids):
+        if not ids:
+            return []
+        marks = ','.join('?' * len(ids))
+        return self._load(f'SELECT data FROM analyses WHERE id IN ({marks})', list(ids))
+
+    def article(self, article_id):
+        rows = self._load('SELECT data FROM articles WHERE id = ?', (article_id,))
+        return rows[0] if rows else None
+
+    def batch_ids(self, batch_id):
+        return [row[0] for row in self._conn.execute('SELECT id FROM analyses WHERE batch_id = ?', (batch_id,))]
+
+    def user_articles(self, user_id, before, limit):
+        if before is None:
+            return self._load('SELECT data FROM articles WHERE user_id = ? ORDER BY id DESC LIMIT ?', (user_id, limit))
+        return self._load('SELECT data FROM articles WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT ?',
+                          (user_id, before, limit))
+
+    def first_analyses(self, article_ids):
+        if not article_ids:
+            return []
+        marks = ','.join('?' * len(article_ids))
+        return self._load(f'SELECT data FROM analyses WHERE id IN (SELECT MIN(id) FROM analyses '
+                          f'WHERE article_id IN ({marks}) GROUP BY article_id)', list(article_ids))
+
+    def duplicates(self, canonical_hash, text_hash, user_id=None):
+        """Spilled analyses of articles with this URL hash or content hash, newest first"""
+        sql = 'SELECT data FROM analyses WHERE (url_hash = ? OR content_hash = ?)'
+        args = [canonical_hash, text_hash]
+        if user_id is not None:
+            sql += ' AND user_id = ?'
+            args.append(user_id)
+        return self._load(sql + ' ORDER BY id DESC', args)
+
+    def recent_analyses(self, limit, since=None):
+        """Spilled complete analyses that were run, not reused, newest completion first"""
+        return self._load("SELECT data FROM analyses WHERE json_extract(data, '$.completed_at') >= ? "
+                          "AND json_extract(data, '$.status') = 'complete' "
+                          "AND json_extract(data, '$.reused_from') IS NULL "
+                          "ORDER BY json_extract(data, '$.completed_at') DESC, id DESC LIMIT ?", (since or 0, limit))
+
+    def max_ids(self):
+        """Highest (article id, analysis id) spilled so far"""
+        article = self._conn.execute('SELECT MAX(id) FROM articles').fetchone()[0]
+        analysis = self._conn.execute('SELECT MAX(id) FROM analyses').fetchone()[0]
+        return article or 0, analysis or 0
+
+    def close(self):
+        self._conn.close()
+
+
+class MemoryStore:
+    """Articles and analyses in process memory, for running without a database.
+
+    Same interface as SqlStore. Memory is bounded: once the estimated size
+    passes ``max_bytes``, finished analyses are evicted least recently used
+    first, as are those idle for ``ttl`` seconds; an article goes when its
+    last analysis does. Queued and running work is never evicted. With a
+    ``spill_path`` evicted entries are appended to a SQLite file and can
+    still be read and found as duplicates. All methods are safe to call
+    from several threads. Jobs must run in the same process (inline), as
+    workers cannot see it.
+    """
+
+    def __init__(self, max_bytes=MEMORY_STORE_MAX_MB * 1024 * 1024, ttl=MEMORY_STORE_TTL, spill_path=MEMORY_STORE_SPILL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._article_ids = itertools.count(1)
+        self._analysis_ids = itertools.count(1)
+        self._articles = {}
+        self._analyses = {}
+        self._sizes = {}
+        self._bytes = 0
+        # Finished analyses by last use, oldest first: the eviction order
+        self._idle = OrderedDict()
+        # Completed analyses that were run (not reused) -> completed_at, in completion order
+        self._completed = OrderedDict()
+        self._article_analyses = {}
+        # user_id -> {article_id: None}, in submission order
+        self._user_articles = {}
+        self._batches = {}
+        self._by_url = {}
+        self._by_hash = {}
+        self._stats = {'evictions': 0, 'expirations': 0, 'spilled': 0}
+        self._spill = SpillFile(spill_path) if spill_path else None
+        if self._spill:
+            # Continue numbering after entries spilled by an earlier run
+            last_article, last_analysis = self._spill.max_ids()
+            self._article_ids = itertools.count(last_article + 1)
+            self._analysis_ids = itertools.count(last_analysis + 1)
+
+    # Bookkeeping
+
+    def _resize(self, key, data):
+        size = _entry_size(data)
+        self._bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+
+    def _index_article(self, article):
+        if article['url_hash']:
+            self._by_url.setdefault(article['url_hash'], set()).add(article['id'])
+        if article['content_hash']:
+            self._by_hash.setdefault(article['content_hash'], set()).add(article['id'])
+
+    def _unindex_article(self, article):
+        for index, key in ((self._by_url, article['url_hash']), (self._by_hash, article['content_hash'])):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(article['id'])
+                if not ids:
+                    del index[key]
+
+    def _touch(self, analysis_id):
+        if analysis_id in self._idle:
+            self._idle[analysis_id] = time.monotonic()
+            self._idle.move_to_end(analysis_id)
+
+    def _evict(self, analysis_id):
+        analysis = self._analyses.pop(analysis_id)
+        self._idle.pop(analysis_id, None)
+        self._completed.pop(analysis_id, None)
+        self._bytes -= self._sizes.pop(('analysis', analysis_id), 0)
+        if self._spill:
+            self._spill.add_analysis(analysis, self._articles.get(analysis['article_id']))
+            self._stats['spilled'] += 1
+        siblings = self._article_analyses.get(analysis['article_id'], [])
+        if analysis_id in siblings:
+            siblings.remove(analysis_id)
+        if not siblings:
+            self._article_analyses.pop(analysis['article_id'], None)
+            article = self._articles.pop(analysis['article_id'], None)
+            if article:
+                self._bytes -= self._sizes.pop(('article', article['id']), 0)
+                self._unindex_article(article)
+                user_articles = self._user_articles[article['user_id']]
+                del user_articles[article['id']]
+                if not user_articles:
+                    del self._user_articles[article['user_id']]
+                if self._spill:
+                    self._spill.add_article(article)
+        batch = analysis['batch_id'] and self._batches.get(analysis['batch_id'])
+        if batch:
+            batch.discard(analysis_id)
+            if not batch:
+                del self._batches[analysis['batch_id']]
+
+    def _enforce_limits(self):
+        if self.ttl:
+            cutoff = time.monotonic() - self.ttl
+            while self._idle and next(iter(self._idle.values())) < cutoff:
+                self._evict(next(iter(self._idle)))
+                self._stats['expirations'] += 1
+        while self._idle and self._bytes > self.max_bytes:
+            self._evict(next(iter(self._idle)))
+            self._stats['evictions'] += 1
+
+    def _analysis(self, analysis_id):
+        analysis = self._analyses.get(analysis_id)
+        if analysis is None and self._spill:
+            spilled = self._spill.analyses([analysis_id])
+            return spilled[0] if spilled else None
+        self._touch(analysis_id)
+        return dict(analysis) if analysis else None
+
+    def _article(self, article_id):
+        article = self._articles.get(article_id)
+        if article is None and self._spill:
+            return self._spill.article(article_id)
+        return dict(article) if article else None
+
+    # SqlStore interface
+
+    def submit(self, user_id, items, lane=None, batch_id=None):
+        """Store one article and a queued analysis per item ({'url', 'raw_text', 'ref', 'sentences'}); returns analysis ids"""
+        now = time.time()
+        with self._lock:
+            ids = []
+            for item in items:
+                article = {
+                    'id': next(self._article_ids),
+                    'user_id': user_id,
+                    'url': item.get('url'),
+                    'url_hash': item_url_hash(item),
+                    'raw_text': item.get('raw_text'),
+                    'content_hash': content_hash(item['raw_text']) if item.get('raw_text') else None,
+                    'submitted_at': now,
+                }
+                analysis = {
+                    'id': next(self._analysis_ids), 'article_id': article['id'], 'status': 'queued',
+                    'lane': lane, 'job_id': None, 'batch_id': batch_id, 'client_ref': item.get('ref'),
+                    'reused_from': None, 'score_sentences': item.get('sentences'), 'error': None,
+                    'created_at': now, 'completed_at': None,
+                    **{field: None for field in RESULT_FIELDS},
+                }
+                self._articles[article['id']] = article
+                self._analyses[analysis['id']] = analysis
+                self._resize(('article', article['id']), article)
+                self._resize(('analysis', analysis['id']), analysis)
+                self._index_article(article)
+                self._article_analyses[article['id']] = [analysis['id']]
+                self._user_articles.setdefault(user_id, {})[article['id']] = None
+                if batch_id:
+                    self._batches.setdefault(batch_id, set()).add(analysis['id'])
+                ids.append(analysis['id'])
+            self._enforce_limits()
+            return ids
+
+    def get_analysis(self, analysis_id):
+        with self._lock:
+            return self._analysis(analysis_id)
+
+    def get_article(self, article_id):
+        with self._lock:
+            return self._article(article_id)
+
+    def get_submissions(self, analysis_ids):
+        """(analysis, article) dict pairs for many analyses, in the given order"""
+        with self._lock:
+            pairs = []
+            for analysis_id in analysis_ids:
+                analysis = self._analysis(analysis_id)
+                article = self._article(analysis['article_id']) if analysis else None
+                if article:
+                    pairs.append((analysis, article))
+            return pairs
+
+    def update_analysis(self, analysis_id, **fields):
+        self.update_analyses([analysis_id], **fields)
+
+    def update_analyses(self, analysis_ids, **fields):
+        with self._lock:
+            for analysis_id in analysis_ids:
+                analysis = self._analyses.get(analysis_id)
+                if analysis is None:
+                    continue
+                analysis.update(fields)
+                self._resize(('analysis', analysis_id), analysis)
+                if analysis['status'] in FINAL_STATUSES:
+                    self._idle[analysis_id] = time.monotonic()
+                    self._idle.move_to_end(analysis_id)
+                else:
+                    self._idle.pop(analysis_id, None)
+            self._enforce_limits()
+
+    def save_results(self, analysis_id, results, raw_text=None, reused_from=None):
+        """Record finished results, and the fetched text if the article only had a URL"""
+        self.save_many([(analysis_id, results, raw_text)], {analysis_id: reused_from} if reused_from else None)
+
+    def save_many(self, outputs, reused_from=None):
+        """save_results for many (analysis_id, results, raw_text) triples"""
+        reused_from = reused_from or {}
+        now = time.time()
+        with self._lock:
+            for analysis_id, results, raw_text in outputs:
+                analysis = self._analyses.get(analysis_id)
+                if analysis is None:
+                    continue
+                analysis.update({field: results.get(field) for field in RESULT_FIELDS})
+                analysis.update(status='complete', error=None, completed_at=now, reused_from=reused_from.get(analysis_id))
+                self._resize(('analysis', analysis_id), analysis)
+                self._idle[analysis_id] = time.monotonic()
+                self._idle.move_to_end(analysis_id)
+                self._completed.pop(analysis_id, None)
+                if not analysis['reused_from']:
+                    self._completed[analysis_id] = now
+                article = self._articles.get(analysis['article_id'])
+                if article and raw_text and not article['raw_text']:
+                    self._unindex_article(article)
+                    article.update(raw_text=raw_text, content_hash=content_hash(raw_text))
+                    self._index_article(article)
+                    self._resize(('article', article['id']), article)
+            self._enforce_limits()
+
+    def find_duplicate(self, canonical=None, text_hash=None, user_id=None, max_age=None):
+        """Newest analysis of the same page or text that is complete or still in flight"""
+        with self._lock:
+            canonical_hash = url_hash(canonical) if canonical else None
+            article_ids = set(self._by_url.get(canonical_hash, ())) | set(self._by_hash.get(text_hash, ()))
+            cutoff = time.time() - max_age if max_age is not None else None
+            best = None
+            for article_id in article_ids:
+                if user_id is not None and self._articles[article_id]['user_id'] != user_id:
+                    continue
+                for analysis_id in self._article_analyses.get(article_id, []):
+                    analysis = self._analyses[analysis_id]
+                    if analysis['status'] == 'failed' or (cutoff is not None and analysis['created_at'] < cutoff):
+                        continue
+                    if best is None or analysis_id > best:
+                        best = analysis_id
+            if self._spill and (canonical or text_hash):
+                # Newest first: stop once past the in-memory match or older than max_age
+                for analysis in self._spill.duplicates(canonical_hash, text_hash, user_id):
+                    if best is not None and analysis['id'] < best:
+                        break
+                    if cutoff is not None and analysis['created_at'] < cutoff:
+                        break
+                    if analysis['status'] != 'failed':
+                        return analysis
+            return self._analysis(best) if best else None
+
+    def recent_texts(self, limit, since=None):
+        """(analysis_id, raw_text, completed_at) of the latest complete analyses that were run, not reused.
+        
+        Newest completion first; ``since`` only returns those completed at or after that time.
+        """
+        with self._lock:
+            rows = []
+            for analysis_id in reversed(self._completed):
+                completed_at = self._completed[analysis_id]
+                if since is not None and completed_at < since or len(rows) == limit:
+                    break
+                analysis = self._analyses[analysis_id]
+                article = self._articles.get(analysis['article_id'])
+                if analysis['status'] == 'complete' and article and article['raw_text']:
+                    rows.append((analysis_id, article['raw_text'], completed_at))
+            if self._spill:
+                for analysis in self._spill.recent_analyses(limit, since):
+                    article = self._article(analysis['article_id'])
+                    if article and article['raw_text']:
+                        rows.append((analysis['id'], article['raw_text'], analysis['completed_at']))
+                rows = sorted(rows, key=lambda row: (row[2], row[0]), reverse=True)[:limit]
+            return rows
+
+    def batch_ids(self, batch_id):
+        """Analysis ids of a batch, in submission order"""
+        with self._lock:
+            ids = set(self._batches.get(batch_id, ()))
+            if self._spill:
+                ids.update(self._spill.batch_ids(batch_id))
+            return sorted(ids)
+
+    def finished(self, analysis_ids, chunk_size=500):
+        """Analyses among analysis_ids that are complete or failed"""
+        with self._lock:
+            done = []
+            spilled = []
+            for analysis_id in analysis_ids:
+                analysis = self._analyses.get(analysis_id)
+                if analysis is None:
+                    spilled.append(analysis_id)
+                elif analysis['status'] in FINAL_STATUSES:
+                    done.append(dict(analysis))
+            if self._spill:
+                for start in range(0, len(spilled), chunk_size):
+                    done.extend(self._spill.analyses(spilled[start:start + chunk_size]))
+            return done
+
+    def history(self, user_id, limit, before=None, fields=HISTORY_DEFAULT_FIELDS):
+        """One page of the user's articles, newest first, with their first analysis (see SqlStore.history)"""
+        article_fields = [f for f in HISTORY_ARTICLE_FIELDS if f in fields]
+        analysis_fields = [f for f in HISTORY_ANALYSIS_FIELDS if f in fields]
+        with self._lock:
+            # Ids are allocated in order, so each user's (insertion-ordered) ids are sorted
+            ids = (i for i in reversed(self._user_articles.get(user_id, {})) if before is None or i < before)
+            articles = [self._articles[i] for i in itertools.islice(ids, limit + 1)]
+            if self._spill:
+                spilled = self._spill.user_articles(user_id, before, limit + 1)
+                articles = sorted(articles + spilled, key=lambda a: a['id'], reverse=True)[:limit + 1]
+            has_more = len(articles) > limit
+            articles = articles[:limit]
+
+            first = {}
+            for article in articles:
+                analysis_ids = self._article_analyses.get(article['id'])
+                if analysis_ids:
+                    first[article['id']] = self._analyses[min(analysis_ids)]
+            if self._spill and analysis_fields:
+                missing = [a['id'] for a in articles if a['id'] not in first]
+                for analysis in self._spill.first_analyses(missing):
+                    first[analysis['article_id']] = analysis
+
+            page = []
+            for article in articles:
+                item = {f: article[f] for f in article_fields}
+                analysis = first.get(article['id'])
+                for f in analysis_fields:
+                    item[f] = analysis[f] if analysis else None
+                page.append(item)
+            return page, (articles[-1]['id'] if has_more else None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'articles': len(self._articles),
+                'analyses': len(self._analyses),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                **self._stats,
+            }
@@ -0,0 +1,142 @@
+import os
+import time
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, exc, inspect, text
+from sqlalchemy.engine import Engine
+
+# SQLite file next to the backend for local runs; docker-compose points this at Postgres
+DATABASE_URL = os.environ.get(
+    'DATABASE_URL', 'sqlite:///' + os.path.join(os.path.dirname(os.path.abspath(__file__)), 'biased.db'))
+# Connection pool for server databases (SQLite connections are cheap and not pooled the same way)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+# Tries at creating and upgrading the schema, which the API and workers all do as they start
+SCHEMA_ATTEMPTS = 3
+
+# expire_on_commit=False keeps committed rows readable after the session closes
+db = SQLAlchemy(session_options={'expire_on_commit': False})
+
+
+class Article(db.Model):
+    __tablename__ = 'articles'
+    # Serves /api/history: a user's articles newest first, resumable from an id (keyset pagination)
+    __table_args__ = (db.Index('ix_articles_user_id_id', 'user_id', 'id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(128), nullable=False, default='demo-user', index=True)
+    url = db.Column(db.Text)
+    # urls.url_hash(urls.canonical_url(url)): links to the same page with different tracking
+    # params match; a digest, so URLs of any length fit the column and its index
+    url_hash = db.Column(db.String(64), index=True)
+    raw_text = db.Column(db.Text)
+    # SHA-256 of the normalized text (result_cache.content_hash)
+    content_hash = db.Column(db.String(64), index=True)
+    submitted_at = db.Column(db.Float, nullable=False, default=time.time, index=True)
+
+    analyses = db.relationship('Analysis', backref='article', lazy='select')
+
+
+class Analysis(db.Model):
+    __tablename__ = 'analyses'
+
+    id = db.Column(db.Integer, primary_key=True)
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id'), nullable=False, index=True)
+    # queued | started | complete | failed
+    status = db.Column(db.String(16), nullable=False, default='queued')
+    lane = db.Column(db.String(16))
+    job_id = db.Column(db.String(64))
+    # Set for submissions made through /api/analyze/batch, with the caller's record id
+    batch_id = db.Column(db.String(32), index=True)
+    client_ref = db.Column(db.String(256))
+    # Analysis whose results were reused because this article is a near-duplicate of its article
+    reused_from = db.Column(db.Integer)
+    # Set when the submitter asked for per-sentence scores (the results heatmap)
+    score_sentences = db.Column(db.Boolean)
+    error = db.Column(db.Text)
+    bias_score = db.Column(db.Float)
+    bias_label = db.Column(db.String(16))
+    sentiment_score = db.Column(db.Float)
+    sentiment_label = db.Column(db.String(16))
+    language_flags = db.Column(db.JSON)
+    sentences = db.Column(db.JSON)
+    created_at = db.Column(db.Float, nullable=False, default=time.time)
+    # Near-duplicate index refreshes load analyses by completion time
+    completed_at = db.Column(db.Float, index=True)
+
+
+def engine_options(url):
+    if url.startswith('sqlite'):
+        # Wait for the other process (API or worker) instead of failing on a locked file
+        return {'connect_args': {'timeout': 15}}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+    }
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets the API read while a worker writes results
+    if type(dbapi_connection).__module__.startswith('sqlite3'):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+
+@event.listens_for(Engine, 'connect')
+def _remember_pid(dbapi_connection, connection_record):
+    connection_record.info['pid'] = os.getpid()
+
+
+@event.listens_for(Engine, 'checkout')
+def _discard_inherited_connection(dbapi_connection, connection_record, connection_proxy):
+    # RQ work horses are forked from a worker that may already hold pooled
+    # connections; the child must open its own instead of sharing the socket
+    if connection_record.info.get('pid') != os.getpid():
+        connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+        raise exc.DisconnectionError('Connection belongs to the parent process')
+
+
+def add_missing_columns():
+    """Add nullable columns and indexes that tables created by an older version lack.
+    
+    Runs in one transaction, so a column is never left without its index.
+    Tables that are up to date cost one inspection and no DDL.
+    """
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(connection)
+
+
+def init_db(app, url=DATABASE_URL):
+    """Bind the shared db to a Flask app and create missing tables"""
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', url)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    db.init_app(app)
+    with app.app_context():
+        for attempt in range(SCHEMA_ATTEMPTS):
+            try:
+                db.create_all()
+                add_missing_columns()
+                return
+            except exc.DBAPIError as e:
+                if attempt == SCHEMA_ATTEMPTS - 1:
+                    raise
+                # Another process starting at the same time created the table, column or index
+                # first ("already exists"); inspecting again finds nothing left to do
+                print(f"Warning: Schema upgrade raced with another process, retrying: {e}")
@@ -0,0 +1,137 @@
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+# Estimated Jaccard similarity of word shingles above which an article counts as a copy of another
+NEAR_DUP_THRESHOLD = float(os.environ.get('NEAR_DUP_THRESHOLD', 0.85))
+# Articles remembered per process (least recently matched are dropped first); 0 turns reuse off
+NEAR_DUP_CAPACITY = int(os.environ.get('NEAR_DUP_CAPACITY', 20000))
+# Recently analyzed articles loaded from the database into a fresh index
+NEAR_DUP_BOOTSTRAP = int(os.environ.get('NEAR_DUP_BOOTSTRAP', 1000))
+# Each refresh re-reads analyses completed this many seconds before the newest one already loaded,
+# so results committed late (or stamped by a worker with a lagging clock) are not skipped
+NEAR_DUP_REFRESH_OVERLAP = float(os.environ.get('NEAR_DUP_REFRESH_OVERLAP', 60))
+NUM_PERM = 128
+SHINGLE_WORDS = 5
+# Shorter texts share too few shingles for the estimate to mean much
+MIN_WORDS = 50
+
+_WORD = re.compile(r'\w+')
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def lsh_params(threshold, num_perm):
+    """(bands, rows) whose S-curve best separates pairs above and below threshold.
+
+    Minimizes the probability mass of false positives (similarity below
+    threshold but sharing a band) plus false negatives (above it but sharing
+    none), integrated over similarity.
+    """
+    below = np.linspace(0.0, threshold, 100)
+    above = np.linspace(threshold, 1.0, 100)
+    best, best_error = (1, num_perm), None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        false_positive = np.mean(1 - (1 - below ** rows) ** bands) * threshold
+        false_negative = np.mean((1 - above ** rows) ** bands) * (1 - threshold)
+        error = false_positive + false_negative
+        if best_error is None or error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDupIndex:
+    """MinHash signatures of analyzed articles with an LSH index over them.
+
+    Signatures are NUM_PERM 32-bit minimums over hashed word shingles, so
+    the share of equal positions estimates the Jaccard similarity of two
+    texts. They are split into bands; articles that share a band bucket
+    are candidates, checked against the threshold. Entries are added one
+    at a time and the least recently used are evicted past ``capacity``,
+    so memory stays bounded (about 1 KB per article). Thread-safe.
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, capacity=NEAR_DUP_CAPACITY, num_perm=NUM_PERM,
+                 shingle_words=SHINGLE_WORDS, min_words=MIN_WORDS, seed=1):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        self.min_words = min_words
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        # Keep a * hash + b below 2**64 so the permutations never overflow
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._signatures = OrderedDict()
+        self._buckets = [dict() for _ in range(self.bands)]
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def signature(self, text):
+        """MinHash signature of text, or None if it is too short to compare"""
+        words = _WORD.findall((text or '').lower())
+        if len(words) < max(self.min_words, self.shingle_words):
+            return None
+        size = self.shingle_words
+        shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key, signature):
+        """Remember signature under key (an analysis id), evicting the oldest entries past capacity"""
+        if signature is None or self.capacity <= 0:
+            return
+        with self._lock:
+            if key in self._signatures:
+                self._remove(key)
+            self._signatures[key] = signature
+            for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+                bucket.setdefault(band_key, set()).add(key)
+            while len(self._signatures) > self.capacity:
+                self._remove(next(iter(self._signatures)))
+
+    def _remove(self, key):
+        signature = self._signatures.pop(key)
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            keys = bucket.get(band_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del bucket[band_key]
+
+    def query(self, signature):
+        """(key, similarity) of the most similar remembered article at or above the threshold, or None"""
+        if signature is None:
+            return None
+        with self._lock:
+            candidates = set()
+            for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(bucket.get(band_key, ()))
+            best = None
+            for key in candidates:
+                similarity = float(np.mean(self._signatures[key] == signature))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity)
+            if best:
+                self._signatures.move_to_end(best[0])
+            return best
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._signatures:
+                self._remove(key)
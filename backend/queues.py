@@ -0,0 +1,64 @@
+import os
+from redis import Redis
+from rq import Callback, Queue, Retry
+
+# Priority lanes, highest first; each lane is its own RQ queue.
+# interactive: single submissions from the frontend
+# bulk: batch uploads and back-fills
+# reanalysis: re-running stored articles after model or lexicon updates
+LANES = ['interactive', 'bulk', 'reanalysis']
+DEFAULT_LANE = 'interactive'
+# Batches of at least this many documents go to the bulk lane
+BULK_THRESHOLD = int(os.environ.get('BULK_LANE_THRESHOLD', 10))
+# Jobs allowed to run at once in each lane across all workers; 0 means no limit
+LANE_CONCURRENCY = {lane: int(os.environ.get(f'LANE_{lane.upper()}_CONCURRENCY', 0)) for lane in LANES}
+# Relative share of dequeues per lane when workers use weighted ordering
+LANE_WEIGHTS = {'interactive': 6, 'bulk': 3, 'reanalysis': 1}
+# Records per queued job for /api/analyze/batch; each job makes batched model calls of this size
+BATCH_JOB_SIZE = int(os.environ.get('BATCH_JOB_SIZE', 16))
+# Set ANALYSIS_QUEUE_MODE=inline to run jobs in the API process (no Redis or worker needed)
+QUEUE_MODE = os.environ.get('ANALYSIS_QUEUE_MODE', 'rq')
+# Hard limit on one job (URL fetch + inference), in seconds
+JOB_TIMEOUT = int(os.environ.get('ANALYSIS_JOB_TIMEOUT', 300))
+# Retries after a failed attempt, and the delays between them in seconds
+JOB_RETRIES = int(os.environ.get('ANALYSIS_JOB_RETRIES', 2))
+RETRY_INTERVALS = [10, 60]
+# How long finished / failed jobs keep their result in Redis, in seconds
+RESULT_TTL = int(os.environ.get('ANALYSIS_RESULT_TTL', 24 * 3600))
+FAILURE_TTL = int(os.environ.get('ANALYSIS_FAILURE_TTL', 7 * 24 * 3600))
+
+redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+# Short connect timeout so the API falls back to inline quickly when Redis is down
+redis_conn = Redis.from_url(redis_url, socket_connect_timeout=1)
+
+def parse_weights(spec, default=LANE_WEIGHTS):
+    """Parse 'interactive=6,bulk=3' into a lane -> weight dict (unlisted lanes keep the default)"""
+    weights = dict(default)
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        lane, _, weight = item.partition('=')
+        if lane in weights and weight:
+            weights[lane] = max(0, int(weight))
+    return weights
+
+def choose_lane(requested=None, batch_size=1):
+    """Lane for a submission: an explicit valid lane wins, then batch size decides"""
+    if requested in LANES:
+        return requested
+    if batch_size >= BULK_THRESHOLD:
+        return 'bulk'
+    return DEFAULT_LANE
+
+def get_queue(lane=DEFAULT_LANE):
+    return Queue(lane, connection=redis_conn)
+
+def enqueue(func, *args, lane=DEFAULT_LANE, on_failure=None):
+    """Enqueue func(*args) on a lane with the standard timeout, retry and TTL policy"""
+    retry = Retry(max=JOB_RETRIES, interval=RETRY_INTERVALS) if JOB_RETRIES else None
+    return get_queue(lane).enqueue(
+        func, *args,
+        on_failure=Callback(on_failure) if on_failure else None,
+        job_timeout=JOB_TIMEOUT,
+        retry=retry,
+        result_ttl=RESULT_TTL,
+        failure_ttl=FAILURE_TTL,
+    )
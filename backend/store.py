@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+from sqlalchemy.orm import load_only, selectinload
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../ai')))
+from models import Analysis, Article, db
+from result_cache import content_hash
+from urls import canonical_url, url_hash
+
+# Fields /api/history can return, split by the table they come from
+HISTORY_ARTICLE_FIELDS = ['id', 'url', 'submitted_at']
+HISTORY_ANALYSIS_FIELDS = ['status', 'bias_score', 'bias_label', 'sentiment_score', 'sentiment_label']
+HISTORY_DEFAULT_FIELDS = ['id', 'url', 'bias_label', 'sentiment_label', 'submitted_at']
+
+RESULT_FIELDS = ['bias_score', 'bias_label', 'sentiment_score', 'sentiment_label', 'language_flags', 'sentences']
+
+# sql: the database at DATABASE_URL; memory: a bounded in-process store (no database, jobs run inline)
+STORE_BACKEND = os.environ.get('STORE_BACKEND', 'sql')
+
+
+def item_url_hash(item):
+    """url_hash of a submission whose text will be fetched from its URL; pasted text may differ from the page"""
+    if item.get('url') and not item.get('raw_text'):
+        return url_hash(canonical_url(item['url']))
+    return None
+
+
+def article_dict(article):
+    return {
+        'id': article.id,
+        'user_id': article.user_id,
+        'url': article.url,
+        'url_hash': article.url_hash,
+        'raw_text': article.raw_text,
+        'content_hash': article.content_hash,
+        'submitted_at': article.submitted_at,
+    }
+
+
+def analysis_dict(analysis):
+    data = {
+        'id': analysis.id,
+        'article_id': analysis.article_id,
+        'status': analysis.status,
+        'lane': analysis.lane,
+        'job_id': analysis.job_id,
+        'batch_id': analysis.batch_id,
+        'client_ref': analysis.client_ref,
+        'reused_from': analysis.reused_from,
+        'score_sentences': analysis.score_sentences,
+        'error': analysis.error,
+        'created_at': analysis.created_at,
+        'completed_at': analysis.completed_at,
+    }
+    for field in RESULT_FIELDS:
+        data[field] = getattr(analysis, field)
+    return data
+
+
+class SqlStore:
+    """Articles and analyses in the SQL database shared by the API and the workers.
+
+    Methods take and return plain dicts so callers never hold ORM objects
+    across sessions. Every method must run inside a Flask app context.
+    """
+
+    def submit(self, user_id, items, lane=None, batch_id=None):
+        """Store one article and a queued analysis per item ({'url', 'raw_text', 'ref', 'sentences'}); returns analysis ids"""
+        articles = [
+            Article(user_id=user_id, url=item.get('url'), raw_text=item.get('raw_text'), url_hash=item_url_hash(item),
+                    content_hash=content_hash(item['raw_text']) if item.get('raw_text') else None)
+            for item in items
+        ]
+        db.session.add_all(articles)
+        # One flush per table: SQLAlchemy batches the rows into multi-row INSERTs
+        db.session.flush()
+        analyses = [Analysis(article_id=article.id, lane=lane, batch_id=batch_id, client_ref=item.get('ref'),
+                             score_sentences=item.get('sentences'))
+                    for article, item in zip(articles, items)]
+        db.session.add_all(analyses)
+        db.session.commit()
+        return [analysis.id for analysis in analyses]
+
+    def get_analysis(self, analysis_id):
+        # populate_existing: callers poll, so never answer from the session's identity map
+        analysis = db.session.get(Analysis, analysis_id, populate_existing=True)
+        return analysis_dict(analysis) if analysis else None
+
+    def find_duplicate(self, canonical=None, text_hash=None, user_id=None, max_age=None):
+        """Newest analysis of the same page or text that is complete or still in flight.
+        
+        Matches articles on canonical URL (by its url_hash) or content hash, optionally only the
+        user's own, and skips failed analyses and ones older than max_age seconds.
+        """
+        matches = []
+        if canonical:
+            matches.append(Article.url_hash == url_hash(canonical))
+        if text_hash:
+            matches.append(Article.content_hash == text_hash)
+        if not matches:
+            return None
+        query = (Analysis.query.join(Article, Analysis.article_id == Article.id)
+                 .filter(db.or_(*matches), Analysis.status.in_(['queued', 'started', 'complete'])))
+        if user_id is not None:
+            query = query.filter(Article.user_id == user_id)
+        if max_age is not None:
+            query = query.filter(Analysis.created_at >= time.time() - max_age)
+        analysis = query.order_by(Analysis.id.desc()).populate_existing().first()
+        # End the read transaction so a caller waiting on another process's insert sees it next time
+        db.session.commit()
+        return analysis_dict(analysis) if analysis else None
+
+    def get_article(self, article_id):
+        article = db.session.get(Article, article_id)
+        return article_dict(article) if article else None
+
+    def get_submissions(self, analysis_ids):
+        """(analysis, article) dict pairs for many analyses, in the given order, in one query"""
+        rows = (db.session.query(Analysis, Article).join(Article, Analysis.article_id == Article.id)
+                .filter(Analysis.id.in_(analysis_ids)).all())
+        found = {analysis.id: (analysis_dict(analysis), article_dict(article)) for analysis, article in rows}
+        return [found[i] for i in analysis_ids if i in found]
+
+    def update_analysis(self, analysis_id, **fields):
+        self.update_analyses([analysis_id], **fields)
+
+    def update_analyses(self, analysis_ids, **fields):
+        if analysis_ids:
+            Analysis.query.filter(Analysis.id.in_(analysis_ids)).update(fields)
+            db.session.commit()
+
+    def save_results(self, analysis_id, results, raw_text=None, reused_from=None):
+        """Record finished results, and the fetched text if the article only had a URL"""
+        self.save_many([(analysis_id, results, raw_text)], {analysis_id: reused_from} if reused_from else None)
+
+    def save_many(self, outputs, reused_from=None):
+        """save_results for many (analysis_id, results, raw_text) triples in one transaction.
+        
+        ``reused_from`` maps analysis ids to the analysis their results were derived from.
+        """
+        reused_from = reused_from or {}
+        # Articles come in one more query, not one per row
+        analyses = {a.id: a for a in Analysis.query.options(selectinload(Analysis.article))
+                    .filter(Analysis.id.in_([o[0] for o in outputs]))}
+        now = time.time()
+        for analysis_id, results, raw_text in outputs:
+            analysis = analyses.get(analysis_id)
+            if analysis is None:
+                continue
+            for field in RESULT_FIELDS:
+                setattr(analysis, field, results.get(field))
+            analysis.status = 'complete'
+            analysis.error = None
+            analysis.completed_at = now
+            analysis.reused_from = reused_from.get(analysis_id)
+            article = analysis.article
+            if raw_text and not article.raw_text:
+                article.raw_text = raw_text
+                article.content_hash = content_hash(raw_text)
+        db.session.commit()
+
+    def recent_texts(self, limit, since=None):
+        """(analysis_id, raw_text, completed_at) of the latest complete analyses that were run, not reused.
+        
+        Newest completion first. ``since`` only returns analyses completed at
+        or after that time, for incremental loading.
+        """
+        query = (db.session.query(Analysis.id, Article.raw_text, Analysis.completed_at)
+                 .join(Article, Analysis.article_id == Article.id)
+                 .filter(Analysis.status == 'complete', Analysis.reused_from.is_(None), Article.raw_text.isnot(None),
+                         Analysis.completed_at.isnot(None)))
+        if since is not None:
+            query = query.filter(Analysis.completed_at >= since)
+        query = query.order_by(Analysis.completed_at.desc(), Analysis.id.desc()).limit(limit)
+        rows = [(row.id, row.raw_text, row.completed_at) for row in query]
+        # End the read transaction so the next call sees analyses committed since
+        db.session.commit()
+        return rows
+
+    def batch_ids(self, batch_id):
+        """Analysis ids of a batch, in submission order"""
+        return [row.id for row in db.session.query(Analysis.id).filter(Analysis.batch_id == batch_id).order_by(Analysis.id)]
+
+    def finished(self, analysis_ids, chunk_size=500):
+        """Analyses among analysis_ids that are complete or failed"""
+        done = []
+        for start in range(0, len(analysis_ids), chunk_size):
+            chunk = analysis_ids[start:start + chunk_size]
+            rows = (Analysis.query.filter(Analysis.id.in_(chunk), Analysis.status.in_(['complete', 'failed']))
+                    .populate_existing())
+            done.extend(analysis_dict(row) for row in rows)
+        # End the read transaction so the next poll sees rows committed since (SQLite reads from a snapshot)
+        db.session.commit()
+        return done
+
+    def history(self, user_id, limit, before=None, fields=HISTORY_DEFAULT_FIELDS):
+        """One page of the user's articles, newest first, with their first analysis.
+        
+        Keyset pagination on (user_id, id): pass the last id of a page as
+        ``before`` to get the next one. Cost depends on the page size only.
+        Returns (rows, next_before); next_before is None on the last page.
+        """
+        article_fields = [f for f in HISTORY_ARTICLE_FIELDS if f in fields or f == 'id']
+        analysis_fields = [f for f in HISTORY_ANALYSIS_FIELDS if f in fields]
+        
+        query = (Article.query.options(load_only(*[getattr(Article, f) for f in article_fields]))
+                 .filter(Article.user_id == user_id))
+        if before is not None:
+            query = query.filter(Article.id < before)
+        # One extra row tells whether another page exists
+        articles = query.order_by(Article.id.desc()).limit(limit + 1).all()
+        has_more = len(articles) > limit
+        articles = articles[:limit]
+        
+        first = {}
+        if articles and analysis_fields:
+            columns = [Analysis.id, Analysis.article_id] + [getattr(Analysis, f) for f in analysis_fields]
+            rows = (db.session.query(*columns)
+                    .filter(Analysis.article_id.in_([a.id for a in articles]))
+                    .order_by(Analysis.id))
+            for row in rows:
+                first.setdefault(row.article_id, row)
+        
+        page = []
+        for article in articles:
+            item = {f: getattr(article, f) for f in article_fields if f in fields}
+            analysis = first.get(article.id)
+            for f in analysis_fields:
+                item[f] = getattr(analysis, f) if analysis else None
+            page.append(item)
+        return page, (articles[-1].id if has_more else None)
+
+
+def create_store(backend=STORE_BACKEND):
+    if backend == 'memory':
+        from memory_store import MemoryStore
+        return MemoryStore()
+    if backend != 'sql':
+        print(f"Warning: Unknown STORE_BACKEND '{backend}', using sql")
+    return SqlStore()
@@ -0,0 +1,51 @@
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# Query parameters that only track where a click came from; they never change the page
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'twclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', 'ref', 'ref_src', 'ref_url', 'cmpid', 'ncid', 'ocid', 'smid', 'spm', 'taid',
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'mtm_', 'hsa_', 'at_')
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url):
+    """Normalized form of a URL, so that links to the same article compare equal.
+
+    Lower-cases the scheme and host, drops a leading ``www.``, default ports,
+    tracking parameters and the fragment, and sorts the remaining query.
+    A URL that cannot be parsed (bad port, malformed IPv6 host) is returned
+    stripped but otherwise unchanged.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f'{host}:{port}'
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not is_tracking_param(name))
+    return urlunsplit((scheme, netloc, parts.path or '/', urlencode(query), ''))
+
+
+def url_hash(canonical):
+    """SHA-256 hex digest of a canonical URL: a fixed-length key however long the URL is"""
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def url_host(url):
+    try:
+        return (urlsplit(url).hostname or '').lower()
+    except ValueError:
+        return ''
@@ -1,16 +1,146 @@
+import gc
 import os
+import random
 import sys
-from redis import Redis
-from rq import Worker, Queue, Connection
+import time
+from rq import SimpleWorker, Worker
+from rq.registry import StartedJobRegistry
+from rq.worker_pool import WorkerPool
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from queues import LANE_CONCURRENCY, LANES, get_queue, parse_weights, redis_conn
 
-listen = ['analysis']
-redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
-redis_conn = Redis.from_url(redis_url)
+# Lanes this worker drains, highest priority first (e.g. WORKER_LANES=bulk,reanalysis)
+listen = [lane for lane in os.environ.get('WORKER_LANES', ','.join(LANES)).split(',') if lane]
+# strict: always take from the highest-priority non-empty lane
+# weighted: pick lane order at random by WORKER_LANE_WEIGHTS, so lower lanes never starve
+LANE_ORDERING = os.environ.get('WORKER_LANE_ORDERING', 'strict')
+LANE_WEIGHTS = parse_weights(os.environ.get('WORKER_LANE_WEIGHTS'))
+# How often a worker re-checks lanes that are at their concurrency limit, in seconds
+LANE_RECHECK_SECONDS = 2
+
+# fork: plain RQ worker, each job's work horse loads the models itself
+# preload: load and warm the models once, then fork a work horse per job (children inherit them)
+# pool: WORKER_PROCESSES long-lived, non-forking workers sharing the preloaded models
+WORKER_MODE = os.environ.get('WORKER_MODE', 'preload')
+WORKER_PROCESSES = int(os.environ.get('WORKER_PROCESSES', 2))
+
+_warmed = False
+
+WARMUP_TEXT = ("The senator said the new tax plan is a shocking disaster for working families. "
+               "Supporters argue it will boost the economy and create jobs.")
+
+def warm_up():
+    """Load every model and run one analysis so lazy initialization happens before any job"""
+    global _warmed
+    if _warmed:
+        return
+    # Fast tokenizers disable their thread pool after a fork anyway; say so up front
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+    # The job module puts ai/ on the path; importing it here also spares each work horse the import
+    import jobs
+    from analyze_text import analyze_text, preload
+    
+    started = time.perf_counter()
+    preload()
+    analyze_text(WARMUP_TEXT, deterministic=True)
+    # Set up the database engine once; forked children replace inherited connections
+    jobs.job_app()
+    # Fill the near-duplicate index now, so work horses inherit it
+    jobs.refresh_near_duplicates()
+    print(f"Models loaded and warmed up in {time.perf_counter() - started:.1f}s")
+    # Keep the loaded objects out of the collector so forked children don't
+    # touch (and copy) their pages during garbage collection
+    gc.freeze()
+    _warmed = True
+
+class LaneMixin:
+    """Dequeues by lane priority and skips lanes at their concurrency limit.
+    
+    The limit is checked against each lane's StartedJobRegistry, which every
+    worker shares, so it holds across processes and hosts (a few jobs may
+    overshoot when several workers check at the same moment).
+    """
+    
+    def reorder_queues(self, reference_queue):
+        # Order is recomputed before every dequeue instead
+        pass
+    
+    def lane_order(self):
+        if LANE_ORDERING != 'weighted':
+            return list(self.queues)
+        # Weighted shuffle: sort by u ** (1 / weight), so each lane comes first in proportion to its weight
+        keys = {q.name: random.random() ** (1.0 / LANE_WEIGHTS[q.name]) if LANE_WEIGHTS.get(q.name) else -1.0
+                for q in self.queues}
+        return sorted(self.queues, key=lambda q: keys[q.name], reverse=True)
+    
+    def open_lanes(self, queues):
+        """Queues whose lane still has room under its concurrency limit"""
+        open_queues = []
+        for queue in queues:
+            limit = LANE_CONCURRENCY.get(queue.name, 0)
+            if not limit or StartedJobRegistry(queue=queue).count < limit:
+                open_queues.append(queue)
+        return open_queues
+    
+    def dequeue_job_and_maintain_ttl(self, timeout, max_idle_time=None):
+        idle_since = time.monotonic()
+        while True:
+            ordered = self.lane_order()
+            self._ordered_queues = self.open_lanes(ordered)
+            if len(self._ordered_queues) == len(ordered):
+                return super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+            
+            # Some lanes are full: wait a short while on the rest, then re-check the limits
+            if self._ordered_queues:
+                wait = LANE_RECHECK_SECONDS if timeout is None else min(timeout, LANE_RECHECK_SECONDS)
+                result = super().dequeue_job_and_maintain_ttl(None if timeout is None else wait, wait)
+                if result is not None:
+                    return result
+            elif timeout is not None:
+                self.heartbeat()
+                time.sleep(LANE_RECHECK_SECONDS)
+            
+            if timeout is None:
+                # Burst mode: nothing runnable right now
+                return None
+            if max_idle_time is not None and time.monotonic() - idle_since >= max_idle_time:
+                return None
+
+class LaneWorker(LaneMixin, Worker):
+    """Forking worker (a fresh work horse per job) with lane priorities and limits"""
+    
+    def execute_job(self, job, queue):
+        if _warmed:
+            # Work horses exit with whatever they add to the near-duplicate index;
+            # catching up here lets each one inherit an up-to-date index instead
+            import jobs
+            try:
+                jobs.refresh_near_duplicates()
+            except Exception as e:
+                print(f"Warning: Could not refresh near-duplicate index: {e}")
+        return super().execute_job(job, queue)
+
+class PreloadedSimpleWorker(LaneMixin, SimpleWorker):
+    """Non-forking worker; runs every job in its own long-lived process"""
+    
+    def __init__(self, *args, **kwargs):
+        # A no-op when the pool process was forked from a warmed-up parent;
+        # loads the models once if it was spawned instead
+        warm_up()
+        super().__init__(*args, **kwargs)
 
 if __name__ == '__main__':
-    with Connection(redis_conn):
-        worker = Worker(list(map(str, listen)))
-        worker.work() 
\ No newline at end of file
+    queues = [get_queue(lane) for lane in listen]
+    if WORKER_MODE == 'pool':
+        warm_up()
+        pool = WorkerPool(queues, connection=redis_conn, num_workers=WORKER_PROCESSES,
+                          worker_class=PreloadedSimpleWorker)
+        pool.start()
+    else:
+        if WORKER_MODE == 'preload':
+            warm_up()
+        # rq 2.x has no Connection context manager; pass the connection explicitly
+        worker = LaneWorker(queues, connection=redis_conn)
+        worker.work()
@@ -7,7 +7,7 @@ import AnalysisStatus from './components/AnalysisStatus'
 import ResultsView from './components/ResultsView'
 import HistoryList from './components/HistoryList'
 import { Container, Box, Typography, Paper } from '@mui/material'
-import { postAnalyze, getStatus, getResults, getHistory } from './api'
+import { postAnalyze, getStatus, getResults, getHistory, subscribeToJob } from './api'
 
 function App() {
   const [status, setStatus] = useState('Idle')
@@ -26,19 +26,28 @@ function App() {
   }, [userId])
 
   useEffect(() => {
+    if (!polling || !jobId) return undefined
     let interval
-    if (polling && jobId) {
+    const finish = (res) => {
+      setPolling(false)
+      setStatus('complete')
+      setResults(res)
+      // Optionally refresh history
+      getHistory(userId).then(setHistoryState)
+    }
+    // Status is pushed over SSE; polling is only the fallback if the stream can't be used
+    const pollStatus = () => {
       interval = setInterval(async () => {
         try {
-          const { status: jobStatus } = await getStatus(jobId)
+          const { status: jobStatus, error: jobError } = await getStatus(jobId)
           setStatus(jobStatus)
           if (jobStatus === 'complete') {
+            clearInterval(interval)
+            finish(await getResults(jobId))
+          } else if (jobStatus === 'failed') {
             clearInterval(interval)
             setPolling(false)
-            const res = await getResults(jobId)
-            setResults(res)
-            // Optionally refresh history
-            getHistory(userId).then(setHistoryState)
+            setError(jobError || 'Analysis failed')
           }
         } catch (err) {
           setError('Error polling job status')
@@ -47,7 +56,22 @@ function App() {
         }
       }, 1500)
     }
-    return () => clearInterval(interval)
+    const unsubscribe = subscribeToJob(jobId, {
+      onStage: setStatus,
+      onComplete: finish,
+      onError: (message) => {
+        if (message) {
+          setPolling(false)
+          setError(message)
+        } else {
+          pollStatus()
+        }
+      },
+    })
+    return () => {
+      unsubscribe()
+      clearInterval(interval)
+    }
   }, [polling, jobId, userId])
 
   const handleAnalyze = async (input) => {
@@ -6,6 +6,8 @@ export async function postAnalyze(input) {
   const formData = new FormData();
   if (input.url) formData.append('url', input.url);
   if (input.file && input.file.length > 0) formData.append('file', input.file[0]);
+  // Per-sentence scores for the sentiment heatmap in ResultsView
+  formData.append('sentences', '1');
   const res = await axios.post(`${API_BASE}/analyze`, formData, {
     headers: { 'Content-Type': 'multipart/form-data' },
   });
@@ -14,7 +16,31 @@ export async function postAnalyze(input) {
 
 export async function getStatus(jobId) {
   const res = await axios.get(`${API_BASE}/status/${jobId}`);
-  return res.data; // { status }
+  return res.data; // { status: queued | started | complete | failed, error? }
+}
+
+// Push updates for one job over Server-Sent Events instead of polling getStatus.
+// onStage(stage) gets queued/fetching/analyzing; onComplete(result) the /results payload;
+// onError(message) a failed job or a lost connection. Returns a function that closes the stream.
+export function subscribeToJob(jobId, { onStage, onComplete, onError }) {
+  const source = new EventSource(`${API_BASE}/jobs/${jobId}/events`);
+  source.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    if (message.stage === 'complete') {
+      source.close();
+      onComplete(message.result);
+    } else if (message.stage === 'failed') {
+      source.close();
+      onError(message.error || 'Analysis failed');
+    } else {
+      onStage(message.stage);
+    }
+  };
+  source.onerror = () => {
+    source.close();
+    onError(null);
+  };
+  return () => source.close();
 }
 
 export async function getResults(jobId) {
@@ -22,7 +48,8 @@ export async function getResults(jobId) {
   return res.data; // { bias_score, bias_label, sentiment_score, sentiment_label, language_flags }
 }
 
-export async function getHistory(userId) {
-  const res = await axios.get(`${API_BASE}/history`, { params: { userId } });
+export async function getHistory(userId, { limit, before } = {}) {
+  // Newest first; pass the X-Next-Before header value as `before` for the next page
+  const res = await axios.get(`${API_BASE}/history`, { params: { userId, limit, before } });
   return res.data; // [{...}]
 } 
\ No newline at end of file
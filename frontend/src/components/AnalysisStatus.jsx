@@ -1,12 +1,22 @@
 import React from 'react';
 import { Box, CircularProgress, Typography, Alert } from '@mui/material';
 
+// Job stages pushed by the backend, shown as friendlier text
+const STAGE_LABELS = {
+  queued: 'Queued',
+  started: 'Analyzing...',
+  fetching: 'Fetching article...',
+  analyzing: 'Analyzing...',
+  complete: 'Complete',
+  failed: 'Failed',
+};
+
 export default function AnalysisStatus({ status, polling, error }) {
   return (
     <Box sx={{ display: 'flex', flexDirection: 'column', alignItems: 'center', mt: 2 }}>
       {polling && <CircularProgress sx={{ mb: 2 }} />}
       <Typography variant="body1">
-        {status}
+        {STAGE_LABELS[status] || status}
       </Typography>
       {error && <Alert severity="error" sx={{ mt: 2 }}>{error}</Alert>}
     </Box>
@@ -1,9 +1,31 @@
 import React from 'react';
-import { Card, CardContent, Typography, Chip, Box } from '@mui/material';
+import { Card, CardContent, Typography, Chip, Box, Tooltip } from '@mui/material';
+
+// Green for positive, red for negative; stronger sentiment is more opaque
+function sentimentColor(score) {
+  const alpha = Math.min(1, Math.abs(score)) * 0.6;
+  return score >= 0 ? `rgba(46, 125, 50, ${alpha})` : `rgba(211, 47, 47, ${alpha})`;
+}
+
+function SentimentHeatmap({ sentences }) {
+  return (
+    <Box sx={{ mt: 1, lineHeight: 1.8 }}>
+      {sentences.map((sentence, idx) => (
+        <React.Fragment key={idx}>
+          <Tooltip title={`${sentence.label} (${sentence.score.toFixed(2)})`}>
+            <Box component="span" sx={{ backgroundColor: sentimentColor(sentence.score), borderRadius: 0.5, px: 0.25 }}>
+              {sentence.text}
+            </Box>
+          </Tooltip>{' '}
+        </React.Fragment>
+      ))}
+    </Box>
+  );
+}
 
 export default function ResultsView({ results }) {
   if (!results) return null;
-  const { bias_score, bias_label, sentiment_score, sentiment_label, language_flags } = results;
+  const { bias_score, bias_label, sentiment_score, sentiment_label, language_flags, sentences } = results;
   return (
     <Card sx={{ mt: 3 }}>
       <CardContent>
@@ -21,8 +43,14 @@ export default function ResultsView({ results }) {
           ) : (
             <Typography variant="body2" color="text.secondary">No loaded language detected.</Typography>
           )}
+          {sentences && sentences.length > 0 && (
+            <>
+              <Typography variant="body1" sx={{ mt: 2 }}>Sentence Sentiment:</Typography>
+              <SentimentHeatmap sentences={sentences} />
+            </>
+          )}
         </Box>
       </CardContent>
     </Card>
   );
-} 
\ No newline at end of file
+} 
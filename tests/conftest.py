@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Keep test runs off the local SQLite file; must be set before backend.models is imported
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+# Keep fetched pages out of backend/.fetch_cache
+os.environ.setdefault('FETCH_CACHE_DIR', tempfile.mkdtemp(prefix='biased-fetch-'))
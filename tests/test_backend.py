@@ -72,4 +72,235 @@ def test_history_endpoint(client):
     response = client.get('/api/history?userId=test')
     assert response.status_code == 200
     data = json.loads(response.data)
-    assert len(data) == 2 
\ No newline at end of file
+    assert len(data) == 2 
+
+def test_history_pagination(client):
+    """Test keyset pagination and field selection on the history endpoint"""
+    with app.app_context():
+        db.session.add_all([Article(user_id='pager', url=f'http://example.com/{i}') for i in range(5)])
+        db.session.commit()
+    
+    response = client.get('/api/history?userId=pager&limit=2&fields=id,url')
+    first_page = json.loads(response.data)
+    assert [item['url'] for item in first_page] == ['http://example.com/4', 'http://example.com/3']
+    assert set(first_page[0]) == {'id', 'url'}
+    
+    response = client.get(f"/api/history?userId=pager&limit=2&before={response.headers['X-Next-Before']}")
+    second_page = json.loads(response.data)
+    assert [item['url'] for item in second_page] == ['http://example.com/2', 'http://example.com/1']
+    assert 'bias_label' in second_page[0]
+    
+    response = client.get('/api/history?userId=pager&fields=url,bogus')
+    assert response.status_code == 400
+    assert 'bogus' in json.loads(response.data)['error']
+    assert 'bias_label' in json.loads(response.data)['allowed']
+
+def test_batch_endpoint_streams_results(client):
+    """Test that a JSONL batch streams one NDJSON line per record plus header and summary"""
+    body = '\n'.join(json.dumps({'id': f'doc-{i}', 'raw_text': f'Article number {i} about the economy.'})
+                     for i in range(3))
+    response = client.post('/api/analyze/batch?userId=batch', data=body)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert lines[0]['total'] == 3
+    assert sorted(line['id'] for line in lines[1:-1]) == ['doc-0', 'doc-1', 'doc-2']
+    assert all('bias_label' in line for line in lines[1:-1])
+    # Unscored sentences come back as in /api/results, not null
+    assert all(line['sentences'] == [] for line in lines[1:-1])
+    assert lines[-1]['done'] and lines[-1]['complete'] == 3
+
+def test_job_events_endpoint(client):
+    """Test that the SSE endpoint sends the final result for a finished job"""
+    response = client.post('/api/analyze', data={'raw_text': 'This is a test article about politics.'})
+    job_id = json.loads(response.data)['jobId']
+    
+    response = client.get(f'/api/jobs/{job_id}/events')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    event = json.loads(response.data.decode().split('data: ', 1)[1])
+    assert event['stage'] == 'complete'
+    assert 'bias_score' in event['result']
+
+def test_analyze_deduplicates_submissions(client):
+    """Test that repeated text and tracking-param variants of a URL reuse the earlier analysis"""
+    from urls import url_hash
+    text = 'The council approved the transit budget on Tuesday.'
+    first = json.loads(client.post('/api/analyze', data={'raw_text': text}).data)
+    again = json.loads(client.post('/api/analyze', data={'raw_text': f'  {text}\n'}).data)
+    assert first['reused'] is False
+    assert again == {'jobId': first['jobId'], 'reused': True}
+    
+    rerun = json.loads(client.post('/api/analyze', data={'raw_text': text, 'lane': 'reanalysis'}).data)
+    assert rerun['jobId'] != first['jobId']
+    
+    with app.app_context():
+        article = Article(user_id='demo-user', url='https://news.example.com/story',
+                          url_hash=url_hash('https://news.example.com/story'), raw_text=text)
+        db.session.add(article)
+        db.session.commit()
+        analysis = Analysis(article_id=article.id, status='complete')
+        db.session.add(analysis)
+        db.session.commit()
+        analysis_id = analysis.id
+    
+    response = client.post('/api/analyze', data={'url': 'https://www.news.example.com/story?utm_source=feed#comments'})
+    assert json.loads(response.data) == {'jobId': analysis_id, 'reused': True}
+
+def test_near_duplicate_reuses_results(client):
+    """Test that a lightly edited copy of an analyzed article reuses its results"""
+    story = ' '.join(f'The regional council met on day {i} to debate the transit budget and bus routes.' for i in range(12))
+    first = json.loads(client.post('/api/analyze', data={'raw_text': story}).data)['jobId']
+    second = json.loads(client.post('/api/analyze', data={'raw_text': 'BREAKING: ' + story + ' Wire staff.'}).data)['jobId']
+    assert second != first
+    
+    with app.app_context():
+        original, copy = db.session.get(Analysis, first), db.session.get(Analysis, second)
+        assert copy.status == 'complete'
+        assert copy.reused_from == first
+        assert (copy.bias_score, copy.sentiment_label) == (original.bias_score, original.sentiment_label)
+
+def test_analyze_accepts_malformed_port(client):
+    """Test that a URL with a malformed port is submitted normally instead of failing the request"""
+    for url in ['http://news.example.com:abc/story', 'http://[::1/story']:
+        response = client.post('/api/analyze', data={'url': url})
+        assert response.status_code == 200
+        assert json.loads(response.data)['reused'] is False
+
+def test_sentence_scores_are_opt_in(client, monkeypatch):
+    """Test that sentence scores are only computed when requested, and a request for them is not served without"""
+    import analyze_text
+    from sentiment_model import split_sentences
+    def fake_sentences_batch(texts, batch_size=None, contexts=None, deterministic=False):
+        return [{'score': 0.0, 'label': 'Neutral',
+                 'sentences': [{'text': s.text, 'start': s.start, 'end': s.end, 'label': 'Neutral', 'score': 0.0}
+                               for s in split_sentences(text)]}
+                for text in texts]
+    monkeypatch.setattr(analyze_text, 'analyze_sentiment_sentences_batch', fake_sentences_batch)
+    monkeypatch.setattr(analyze_text, 'analyze_sentiment_sentences',
+                        lambda text, context=None, deterministic=False: fake_sentences_batch([text])[0])
+    text = 'The council approved the budget. Critics called the vote rushed.'
+    plain = json.loads(client.post('/api/analyze', data={'raw_text': text}).data)['jobId']
+    assert json.loads(client.get(f'/api/results/{plain}').data)['sentences'] == []
+    
+    scored = json.loads(client.post('/api/analyze', data={'raw_text': text, 'sentences': '1'}).data)
+    assert scored['reused'] is False
+    sentences = json.loads(client.get(f"/api/results/{scored['jobId']}").data)['sentences']
+    assert [s['text'] for s in sentences] == ['The council approved the budget.', 'Critics called the vote rushed.']
+    
+    again = json.loads(client.post('/api/analyze', data={'raw_text': text, 'sentences': '1'}).data)
+    assert again == {'jobId': scored['jobId'], 'reused': True}
+
+def test_init_db_upgrades_older_schema(tmp_path):
+    """Test that startup adds the columns and indexes a database from an older version lacks"""
+    import sqlite3
+    from flask import Flask
+    from sqlalchemy import inspect
+    from models import init_db
+    path = tmp_path / 'old.db'
+    connection = sqlite3.connect(path)
+    connection.executescript('''
+        CREATE TABLE articles (id INTEGER PRIMARY KEY, user_id VARCHAR(128) NOT NULL, url TEXT, raw_text TEXT,
+                               submitted_at FLOAT NOT NULL);
+        CREATE TABLE analyses (id INTEGER PRIMARY KEY, article_id INTEGER NOT NULL, status VARCHAR(16) NOT NULL,
+                               bias_score FLOAT, created_at FLOAT NOT NULL);
+        INSERT INTO articles VALUES (1, 'reader', 'https://example.com/a', NULL, 0);
+    ''')
+    connection.close()
+    
+    old_app = Flask(__name__)
+    old_app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    init_db(old_app)
+    with old_app.app_context():
+        inspector = inspect(db.engine)
+        assert {'url_hash', 'content_hash'} <= {c['name'] for c in inspector.get_columns('articles')}
+        assert {'reused_from', 'score_sentences'} <= {c['name'] for c in inspector.get_columns('analyses')}
+        indexes = {index['name'] for index in inspector.get_indexes('articles')}
+        assert {'ix_articles_url_hash', 'ix_articles_content_hash', 'ix_articles_user_id_id'} <= indexes
+        assert db.session.execute(db.text('SELECT url FROM articles')).scalar() == 'https://example.com/a'
+        db.engine.dispose()
+
+def test_near_duplicate_index_loads_out_of_order_completions(client):
+    """Test that an analysis finishing after one with a higher id still reaches the near-duplicate index"""
+    import jobs
+    texts = [' '.join(f'Story {n} sentence {i} about the harbour, the ferry and the new timetable.' for i in range(12))
+             for n in ('one', 'two')]
+    with app.app_context():
+        first, second = jobs.store.submit('workers', [{'raw_text': text} for text in texts])
+        jobs.store.save_results(second, {'bias_label': 'Center'})
+        jobs.refresh_near_duplicates()
+        jobs.store.save_results(first, {'bias_label': 'Center'})
+        jobs.refresh_near_duplicates()
+        assert first in jobs.near_dups and second in jobs.near_dups
+
+def test_long_urls_are_deduplicated_by_digest(client):
+    """Test that URLs longer than any VARCHAR limit are stored as a fixed-length hash and still matched"""
+    url = 'https://news.example.com/story?q=' + 'x' * 5000
+    first = json.loads(client.post('/api/analyze', data={'url': url}).data)
+    again = json.loads(client.post('/api/analyze', data={'url': url + '&utm_source=feed'}).data)
+    assert again == {'jobId': first['jobId'], 'reused': True}
+    with app.app_context():
+        assert len(db.session.get(Analysis, first['jobId']).article.url_hash) == 64
+
+def test_init_db_survives_concurrent_upgrade(tmp_path, monkeypatch):
+    """Test that startup retries when another process adds the same column first"""
+    import models
+    from flask import Flask
+    from sqlalchemy.exc import OperationalError
+    upgrade = models.add_missing_columns
+    calls = []
+    def racing_upgrade():
+        calls.append(1)
+        if len(calls) == 1:
+            upgrade()
+            raise OperationalError('ALTER TABLE', {}, Exception('duplicate column name: url_hash'))
+        upgrade()
+    monkeypatch.setattr(models, 'add_missing_columns', racing_upgrade)
+    racing_app = Flask(__name__)
+    racing_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'race.db'}"
+    models.init_db(racing_app)
+    assert len(calls) == 2
+    with racing_app.app_context():
+        db.engine.dispose()
+
+def test_stale_queued_duplicate_is_not_reused(client):
+    """Test that a queued analysis whose job was lost long ago does not absorb new submissions"""
+    import time
+    from dedup import DEDUP_IN_FLIGHT_MAX_AGE
+    from result_cache import content_hash
+    text = 'The harbour authority delayed the ferry timetable again.'
+    with app.app_context():
+        article = Article(user_id='demo-user', raw_text=text, content_hash=content_hash(text))
+        db.session.add(article)
+        db.session.commit()
+        stale = Analysis(article_id=article.id, status='queued', created_at=time.time() - DEDUP_IN_FLIGHT_MAX_AGE - 60)
+        db.session.add(stale)
+        db.session.commit()
+        stale_id = stale.id
+    
+    response = json.loads(client.post('/api/analyze', data={'raw_text': text}).data)
+    assert response['reused'] is False and response['jobId'] != stale_id
+
+def test_pasted_text_is_not_matched_by_its_url(client):
+    """Test that a URL-only submission does not reuse an analysis of text pasted alongside that URL"""
+    url = 'https://news.example.com/pasted-story'
+    pasted = json.loads(client.post('/api/analyze', data={'url': url, 'raw_text': 'An excerpt someone pasted.'}).data)
+    fetched = json.loads(client.post('/api/analyze', data={'url': url}).data)
+    assert fetched['reused'] is False and fetched['jobId'] != pasted['jobId']
+
+def test_save_many_loads_articles_in_one_query(client):
+    """Test that saving a batch of results does not select each article separately"""
+    import jobs
+    from sqlalchemy import event
+    with app.app_context():
+        ids = jobs.store.submit('batcher', [{'url': f'https://example.com/{i}'} for i in range(10)])
+        selects = []
+        def count(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith('SELECT'):
+                selects.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            jobs.store.save_many([(i, {'bias_label': 'Center'}, f'text {i}') for i in ids])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        assert len(selects) == 2
+        assert db.session.get(Analysis, ids[3]).article.raw_text == f'text {ids[3]}'
@@ -0,0 +1,39 @@
+import os
+import re
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../ai')))
+from chunking import token_windows
+
+class WhitespaceTokenizer:
+    """Minimal stand-in for a fast HF tokenizer: one token per word"""
+    model_max_length = 12
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+    def __call__(self, text, **kwargs):
+        return {'offset_mapping': [m.span() for m in re.finditer(r'\S+', text)]}
+
+TEXT = ' '.join(f'w{i}' for i in range(45))
+
+def test_windows_cover_whole_text_with_stride():
+    """Test that windows are packed to the token limit, overlap and reach the end"""
+    windows = token_windows(TEXT, WhitespaceTokenizer(), stride=2, max_windows=None)
+    assert all(w.n_tokens <= 10 for w in windows)
+    assert windows[0].text.split() == [f'w{i}' for i in range(10)]
+    assert windows[1].text.split()[:2] == ['w8', 'w9']
+    assert windows[-1].text.endswith('w44')
+    assert all(TEXT[w.start:w.end] == w.text for w in windows)
+
+def test_window_cap_keeps_spread():
+    """Test that capping keeps the first and last windows"""
+    windows = token_windows(TEXT, WhitespaceTokenizer(), stride=0, max_windows=3)
+    assert len(windows) == 3
+    assert windows[0].start == 0
+    assert windows[-1].text.endswith('w44')
+
+def test_falls_back_without_tokenizer():
+    """Test character-based windows when no tokenizer is available"""
+    windows = token_windows('word ' * 300, None)
+    assert len(windows) == 3
+    assert all(len(w.text) <= 512 for w in windows)
@@ -0,0 +1,28 @@
+import glob
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+from extractors import bs4_extract, lxml_extract
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '../backend/fixtures/html/*.html')))
+
+def test_lxml_matches_bs4_on_fixtures():
+    """Test that the lxml extractor returns the same text as the bs4 one on the saved pages"""
+    assert FIXTURES
+    for path in FIXTURES:
+        with open(path, 'rb') as f:
+            html = f.read()
+        assert lxml_extract(html) == bs4_extract(html), path
+
+def test_lxml_skips_scripts_and_stops_at_budget():
+    """Test that scripts are dropped, the first container kind wins and text is cut at max_chars"""
+    html = ("<html><body><div class='sidebar'>Menu</div><article><script>var x = 1;</script>"
+            + "<p>Words here.</p>" * 100 + "</article><main>Other</main></body></html>")
+    text = lxml_extract(html, max_chars=50)
+    assert text == ('Words here. ' * 5)[:50]
+    assert lxml_extract('') == ''
+
+def test_empty_containers_fall_back_to_page_text():
+    """Test that containers without text make both extractors read the whole page"""
+    html = '<html><body><div class="content"> </div><p>Real body</p></body></html>'
+    assert lxml_extract(html) == bs4_extract(html) == 'Real body'
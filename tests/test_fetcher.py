@@ -0,0 +1,66 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+from fetcher import Fetcher
+
+PAGE = b"<html><body><nav>Menu</nav><article><p>Local news story.</p></article></body></html>"
+ETAG = '"v1"'
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, self.headers.get('If-None-Match')))
+        if self.path.startswith('/missing'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ArticleHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+def test_fetch_caches_and_revalidates(tmp_path):
+    """Test that fresh entries skip the network and stale ones are revalidated with the ETag"""
+    server, base = start_server()
+    try:
+        ArticleHandler.requests_seen = []
+        fetcher = Fetcher(cache_dir=str(tmp_path), ttl=60)
+        assert fetcher.fetch(f'{base}/story#comments') == 'Local news story.'
+        # Same canonical URL, still fresh: served from disk
+        assert Fetcher(cache_dir=str(tmp_path), ttl=60).fetch(f'{base}/story') == 'Local news story.'
+        assert len(ArticleHandler.requests_seen) == 1
+
+        stale = Fetcher(cache_dir=str(tmp_path), ttl=0)
+        assert stale.fetch(f'{base}/story') == 'Local news story.'
+        assert ArticleHandler.requests_seen[-1] == ('/story', ETAG)
+        assert stale.stats()['revalidated'] == 1
+    finally:
+        server.shutdown()
+
+def test_fetch_many_keeps_order(tmp_path):
+    """Test that fetch_many returns texts in input order and '' for failed pages and bad URLs"""
+    server, base = start_server()
+    try:
+        fetcher = Fetcher(cache_dir=str(tmp_path), host_concurrency=2, workers=4)
+        urls = [f'{base}/a', f'{base}/missing', f'{base}/b', 'http://news.example.com:abc/x', None, f'{base}/c']
+        assert fetcher.fetch_many(urls) == ['Local news story.', '', 'Local news story.', '', '', 'Local news story.']
+        assert fetcher.stats()['errors'] == 3
+    finally:
+        server.shutdown()
@@ -0,0 +1,43 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../ai')))
+from language_flags import detect_loaded_language, find_loaded_terms, split_for_spacy
+
+def test_finds_multi_word_terms_and_repeats():
+    """Test that multi-word terms and every occurrence are reported with offsets"""
+    text = "This is fake news. The deep state says time is running out. Shocking, truly shocking."
+    hits = find_loaded_terms(text)
+    terms = [hit['term'] for hit in hits]
+    assert {'fake news', 'deep state', 'time is running out'} <= set(terms)
+    assert terms.count('shocking') == 2
+    for hit in hits:
+        assert text[hit['index']:hit['end']].lower() == hit['term']
+
+def test_flags_are_deduplicated_and_capped():
+    """Test that detect_loaded_language keeps at most five flags with unique snippets"""
+    text = ' '.join(['An urgent, shocking and devastating crisis.'] * 50)
+    flags = detect_loaded_language(text)
+    assert len(flags) == 5
+    assert len({flag['snippet'] for flag in flags}) == 5
+
+def test_streamed_flags_use_document_offsets():
+    """Test that flags found while streaming point into the whole text, including a term cut by a section boundary"""
+    from streaming import analyze_text_stream, iter_sections
+    text = ('Nothing much happens in this plain opening line. time is running out for the council. '
+            'Later on the deep state is blamed for a shocking crisis in the town.')
+    boundary = len(next(iter_sections([text], 60)))
+    flags = list(analyze_text_stream([text], section_chars=60, deterministic=True))[-1]['language_flags']
+    assert any(flag['index'] < boundary < flag['end'] for flag in flags)
+    for flag in flags:
+        assert text[flag['index']:flag['end']].lower() == flag['term']
+
+def test_spacy_pieces_overlap_across_cuts():
+    """Test that a term cut by a piece boundary is whole, at its own offset, in the next piece"""
+    text = 'Filler words go here. ' * 20 + 'They warned that time is running out for the plan. ' + 'More filler text. ' * 20
+    term_start = text.index('time is running out')
+    pieces = split_for_spacy(text, max_chars=term_start + 8)
+    assert len(pieces) > 1 and pieces[0][0] + len(pieces[0][1]) < term_start + len('time is running out')
+    assert any(chunk[term_start - offset:].startswith('time is running out') for offset, chunk in pieces[1:]
+               if offset <= term_start)
+    for offset, chunk in pieces:
+        assert text[offset:offset + len(chunk)] == chunk
@@ -0,0 +1,23 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../ai')))
+import pytest
+from lazy import LazyLoader
+
+def test_failed_load_is_not_retried_until_backoff_ends():
+    """Test that a failing factory runs once per backoff period and its error is raised again"""
+    calls = []
+    def factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError('model missing')
+        return 'model'
+    loader = LazyLoader(factory)
+    for _ in range(3):
+        with pytest.raises(OSError, match='model missing'):
+            loader.get()
+    assert len(calls) == 1 and not loader.loaded
+    
+    loader.retry_after = 0
+    assert loader.get() == 'model'
+    assert len(calls) == 2 and loader.loaded
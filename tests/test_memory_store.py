@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../ai')))
+from memory_store import MemoryStore
+
+RESULTS = {'bias_score': 0.5, 'bias_label': 'Center', 'sentiment_score': 0.0, 'sentiment_label': 'Neutral',
+           'language_flags': [], 'sentences': []}
+
+def test_evicts_finished_analyses_to_spill_file(tmp_path):
+    """Test that the memory budget evicts least recently used finished work, which stays readable from the spill file"""
+    store = MemoryStore(ttl=0, spill_path=str(tmp_path / 'spill.db'))
+    ids = store.submit('reader', [{'raw_text': f'article {i} ' + 'x' * 3000} for i in range(4)])
+    store.save_many([(i, RESULTS, None) for i in ids])
+    # Room for exactly these four; ids[0] becomes the most recently used
+    store.max_bytes = store.stats()['bytes']
+    store.get_analysis(ids[0])
+    
+    ids += store.submit('reader', [{'raw_text': f'article {i} ' + 'x' * 3000} for i in range(4, 6)])
+    # Only finished work is evicted, least recently used first
+    assert store.stats()['evictions'] == 2
+    assert ids[0] in store._analyses and ids[1] not in store._analyses and ids[2] not in store._analyses
+    store.save_many([(i, RESULTS, None) for i in ids[4:]])
+    assert store.stats()['bytes'] <= store.max_bytes
+    
+    assert store.get_analysis(ids[1])['bias_label'] == 'Center'
+    assert store.get_article(store.get_analysis(ids[1])['article_id'])['raw_text'].startswith('article 1 ')
+    assert len(store.finished(ids)) == 6
+    page, next_before = store.history('reader', limit=4)
+    assert [item['id'] for item in page] == [6, 5, 4, 3] and next_before == 3
+    assert all(item['bias_label'] == 'Center' for item in page)
+
+def test_ids_are_unique_across_threads():
+    """Test that concurrent submissions never share an id"""
+    store = MemoryStore()
+    ids = []
+    def submit():
+        for _ in range(200):
+            ids.extend(store.submit('reader', [{'raw_text': 'text'}]))
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(ids) == list(range(1, 1601))
+
+def test_duplicates_and_recent_texts_include_spilled_work(tmp_path):
+    """Test that find_duplicate and recent_texts still see analyses after they are evicted to the spill file"""
+    path = str(tmp_path / 'spill.db')
+    store = MemoryStore(ttl=0, spill_path=path)
+    ids = store.submit('reader', [{'url': 'https://example.com/story?utm_source=feed'}, {'raw_text': 'Some article'}])
+    store.save_many([(ids[0], RESULTS, 'Fetched story text'), (ids[1], RESULTS, None)])
+    store.max_bytes = 0
+    store.submit('reader', [{'raw_text': 'queued'}])
+    assert not store._idle
+    
+    restarted = MemoryStore(spill_path=path)
+    assert restarted.find_duplicate(canonical='https://example.com/story', user_id='reader')['id'] == ids[0]
+    assert restarted.find_duplicate(text_hash=store.get_article(store.get_analysis(ids[1])['article_id'])['content_hash'])['id'] == ids[1]
+    assert restarted.find_duplicate(canonical='https://example.com/story', user_id='someone-else') is None
+    completed_at = store.get_analysis(ids[0])['completed_at']
+    assert restarted.recent_texts(10) == [(ids[1], 'Some article', completed_at),
+                                          (ids[0], 'Fetched story text', completed_at)]
+    assert restarted.recent_texts(10, since=completed_at + 1) == []
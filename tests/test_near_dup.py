@@ -0,0 +1,36 @@
+import os
+import random
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+from near_dup import NearDupIndex
+
+random.seed(3)
+VOCABULARY = [f'word{i}' for i in range(2000)]
+
+def article(n_words=300):
+    return ' '.join(random.choice(VOCABULARY) for _ in range(n_words))
+
+def test_finds_edited_copy_and_ignores_unrelated_text():
+    """Test that a wire copy with a new headline and byline matches, and other articles do not"""
+    index = NearDupIndex(threshold=0.8)
+    original = article()
+    index.add(1, index.signature(original))
+    for key in range(2, 50):
+        index.add(key, index.signature(article()))
+    
+    copy = 'Updated headline here. ' + original + ' Reporting by staff.'
+    key, similarity = index.query(index.signature(copy))
+    assert key == 1 and similarity >= 0.8
+    assert index.query(index.signature(article())) is None
+    assert index.signature('too short to compare') is None
+
+def test_capacity_bounds_the_index():
+    """Test that the least recently used signatures and their buckets are evicted"""
+    index = NearDupIndex(capacity=3)
+    texts = [article() for _ in range(5)]
+    for key, text in enumerate(texts):
+        index.add(key, index.signature(text))
+    assert len(index) == 3
+    assert index.query(index.signature(texts[0])) is None
+    assert index.query(index.signature(texts[4]))[0] == 4
+    assert all(keys <= {2, 3, 4} for bucket in index._buckets for keys in bucket.values())
@@ -0,0 +1,38 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../ai')))
+from pattern_matcher import PatternMatcher
+
+def test_matches_every_phrase_in_one_pass():
+    """Test that overlapping and multi-word phrases are all found"""
+    matcher = PatternMatcher()
+    matcher.add_all(['tax cuts', 'corporate tax cuts', 'cuts'])
+    hits = matcher.findall('Corporate tax cuts and more tax cuts.')
+    phrases = [phrase for _, _, phrase in hits]
+    assert phrases.count('tax cuts') == 2
+    assert phrases.count('corporate tax cuts') == 1
+    assert phrases.count('cuts') == 2
+
+def test_respects_word_boundaries():
+    """Test that phrases only match whole words"""
+    matcher = PatternMatcher()
+    matcher.add_all(['right', 'lgbtq+ rights'])
+    assert matcher.matched_phrases('Civil rights are bright') == set()
+    assert matcher.matched_phrases('The right call on LGBTQ+ rights') == {'right', 'lgbtq+ rights'}
+
+def test_payloads_are_kept_per_phrase():
+    """Test that a phrase added under several categories keeps every payload"""
+    matcher = PatternMatcher()
+    matcher.add('fossil fuels', ('left', 'environmental', 1))
+    matcher.add('fossil fuels', ('right', 'environmental', 1))
+    assert matcher.payloads('fossil fuels') == [('left', 'environmental', 1), ('right', 'environmental', 1)]
+    start, end, phrase = matcher.findall('Fossil fuels remain cheap')[0]
+    assert (start, end, phrase) == (0, 12, 'fossil fuels')
+
+def test_offsets_point_into_original_text():
+    """Test that offsets stay exact after characters whose lowercase form is longer"""
+    matcher = PatternMatcher()
+    matcher.add('tax cuts')
+    text = 'İİ İstanbul: Tax cuts'
+    start, end, phrase = matcher.findall(text)[0]
+    assert text[start:end] == 'Tax cuts'
@@ -0,0 +1,52 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../ai')))
+from result_cache import ResultCache
+
+def test_hit_after_set_ignores_whitespace():
+    """Test that texts differing only in whitespace share a cache entry"""
+    cache = ResultCache(version='test')
+    cache.set('Some  article\ntext', {'bias_label': 'Center'})
+    assert cache.get(' Some article text ') == {'bias_label': 'Center'}
+    assert cache.stats()['hits'] == 1
+
+def test_version_is_part_of_key():
+    """Test that a new model/lexicon version does not reuse old results"""
+    ResultCache(version='v1').set('text', {'bias_label': 'Left'})
+    cache = ResultCache(version='v2')
+    assert cache.get('text') is None
+    assert cache.stats()['misses'] == 1
+
+def test_lru_eviction_and_ttl():
+    """Test size-bounded eviction and expiry"""
+    cache = ResultCache(version='test', max_entries=2, ttl=None)
+    cache.set('a', {'n': 1})
+    cache.set('b', {'n': 2})
+    cache.get('a')
+    cache.set('c', {'n': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1}
+    assert cache.stats()['evictions'] == 1
+
+    expiring = ResultCache(version='test', ttl=-1)
+    expiring.set('a', {'n': 1})
+    assert expiring.get('a') is None
+    assert expiring.stats()['expirations'] == 1
+
+def test_get_or_compute_runs_once():
+    """Test that a cached result is not recomputed"""
+    cache = ResultCache(version='test')
+    calls = []
+    compute = lambda: calls.append(1) or {'bias_label': 'Right'}
+    assert cache.get_or_compute('text', compute) == {'bias_label': 'Right'}
+    assert cache.get_or_compute('text', compute) == {'bias_label': 'Right'}
+    assert len(calls) == 1
+
+def test_analysis_version_covers_backend_and_sentences(monkeypatch):
+    """Test that switching the inference backend or sentence scoring changes the cache version"""
+    import analyze_text
+    base = analyze_text.analysis_version()
+    monkeypatch.setattr(analyze_text, 'INFERENCE_BACKEND', 'onnx' if analyze_text.INFERENCE_BACKEND == 'torch' else 'torch')
+    other_backend = analyze_text.analysis_version()
+    monkeypatch.setattr(analyze_text, 'SENTENCE_SENTIMENT', not analyze_text.SENTENCE_SENTIMENT)
+    assert len({base, other_backend, analyze_text.analysis_version()}) == 3
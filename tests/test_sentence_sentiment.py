@@ -0,0 +1,13 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../ai')))
+from sentiment_model import split_sentences
+
+def test_sentence_spans_point_into_text():
+    """Test that sentences are segmented with exact character spans"""
+    text = 'Taxes rose 3.5 percent. Critics called it "a disaster!" Really?\n\nA headline\nMore text'
+    sentences = split_sentences(text)
+    assert [s.text for s in sentences] == [
+        'Taxes rose 3.5 percent.', 'Critics called it "a disaster!"', 'Really?', 'A headline', 'More text']
+    for sentence in sentences:
+        assert text[sentence.start:sentence.end] == sentence.text